@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Compare chunking strategies on synthetic edit patterns.
+
+For every strategy the script measures how fast a local file is chunked,
+how fast an edited remote version streams through the delta engine, and
+which fraction of the new version could be reused from the old one.
+
+    python benchmarks/bench_chunking.py --size-mb 32
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'ifetch'))
+
+from chunker import FileChunker  # noqa: E402
+
+
+WORDS = [
+    b'lorem', b'ipsum', b'dolor', b'sit', b'amet', b'invoice', b'total', b'account',
+    b'record', b'status', b'pending', b'completed', b'2024', b'<row>', b'</row>', b'\n',
+]
+
+
+def make_data(size: int, rng: random.Random) -> bytes:
+    """Build document-like data: text runs interleaved with binary blobs."""
+    parts = []
+    length = 0
+    while length < size:
+        if rng.random() < 0.8:
+            piece = b' '.join(rng.choices(WORDS, k=rng.randint(50, 400)))
+        else:
+            piece = rng.randbytes(rng.randint(1024, 16384))
+        parts.append(piece)
+        length += len(piece)
+    return b''.join(parts)[:size]
+
+
+def edit_patterns(data: bytes, rng: random.Random):
+    """Yield (name, edited data) pairs for common edit patterns."""
+    size = len(data)
+    yield 'unchanged', data
+    yield 'append-1%', data + rng.randbytes(size // 100)
+    yield 'prepend-1-byte', b'#' + data
+    yield 'insert-4K-middle', data[:size // 2] + rng.randbytes(4096) + data[size // 2:]
+    yield 'delete-64K', data[:size // 3] + data[size // 3 + 65536:]
+
+    edited = bytearray(data)
+    for _ in range(32):
+        pos = rng.randrange(size - 16)
+        edited[pos:pos + 16] = rng.randbytes(16)
+    yield 'overwrite-32x16B', bytes(edited)
+
+    edited = data
+    for _ in range(16):
+        pos = rng.randrange(len(edited))
+        edited = edited[:pos] + rng.randbytes(100) + edited[pos:]
+    yield 'insert-16x100B', edited
+
+
+def run(spec: str, rolling: bool, old_path: Path, patterns) -> None:
+    chunker = FileChunker.from_spec(spec, rolling=rolling).for_size(old_path.stat().st_size)
+    label = spec + (' +rolling' if rolling else '')
+    size_mb = old_path.stat().st_size / (1024 * 1024)
+
+    started = time.perf_counter()
+    existing = chunker.get_file_chunks(old_path)
+    index_rate = size_mb / (time.perf_counter() - started)
+
+    for name, new_data in patterns:
+        blocks = (new_data[i:i + 65536] for i in range(0, len(new_data), 65536))
+        started = time.perf_counter()
+        result = chunker.stream_delta(blocks, existing, None)
+        elapsed = time.perf_counter() - started
+        reuse = 1 - result.bytes_changed / max(len(new_data), 1)
+        print(
+            f"{label:<22} {name:<18} index {index_rate:8.1f} MB/s  "
+            f"delta {len(new_data) / (1024 * 1024) / elapsed:8.1f} MB/s  "
+            f"reuse {reuse * 100:6.2f}%  changed {result.bytes_changed:>10} B"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=16, help='Size of the synthetic file (default: 16)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+    parser.add_argument(
+        '--strategies',
+        default='auto,1M,64K,cdc,cdc:16K:64K:256K',
+        help='Comma-separated --chunk-size specs to compare'
+    )
+    parser.add_argument('--rolling', action='store_true', help='Also run fixed strategies with rolling matching')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    data = make_data(args.size_mb * 1024 * 1024, rng)
+    patterns = list(edit_patterns(data, rng))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path = Path(tmp) / 'old.bin'
+        old_path.write_bytes(data)
+        for spec in args.strategies.split(','):
+            run(spec, False, old_path, patterns)
+            if args.rolling and not spec.startswith('cdc'):
+                run(spec, True, old_path, patterns)
+
+
+if __name__ == '__main__':
+    main()
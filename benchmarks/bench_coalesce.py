@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Show how range coalescing trades wasted bytes for fewer requests.
+
+For several change patterns over a file of fixed-size chunks, the script
+prints the number of range requests and the unneeded bytes fetched for each
+gap threshold, plus a modeled transfer time (requests x RTT + bytes /
+bandwidth).
+
+    python benchmarks/bench_coalesce.py --size-mb 1024 --rtt-ms 50 --bandwidth-mb 20
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'ifetch'))
+
+from chunking import parse_size  # noqa: E402
+from ranges import coalesce_ranges, range_bytes  # noqa: E402
+
+
+def change_patterns(chunks: int, rng: random.Random):
+    """Yield (name, changed chunk indexes) pairs."""
+    yield 'every-other', list(range(0, chunks, 2))
+    yield 'every-8th', list(range(0, chunks, 8))
+    yield 'random-10%', sorted(rng.sample(range(chunks), chunks // 10))
+    yield 'random-1%', sorted(rng.sample(range(chunks), max(chunks // 100, 1)))
+
+    bursts = set()
+    for _ in range(max(chunks // 200, 1)):
+        first = rng.randrange(chunks)
+        bursts.update(range(first, min(first + rng.randint(2, 20), chunks)))
+    yield 'clustered', sorted(bursts)
+
+    yield 'head+tail', list(range(0, 4)) + list(range(chunks - 4, chunks))
+
+
+def to_ranges(indexes, chunk_size: int, total_size: int):
+    return [(i * chunk_size, min((i + 1) * chunk_size, total_size) - 1) for i in indexes]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=1024, help='Modeled file size (default: 1024)')
+    parser.add_argument('--chunk-size', default='1M', help='Chunk size (default: 1M)')
+    parser.add_argument('--gaps', default='0,256K,1M,4M,16M', help='Comma-separated gap thresholds')
+    parser.add_argument('--max-request-size', default='64M', help='Cap per request (default: 64M)')
+    parser.add_argument('--rtt-ms', type=float, default=50.0, help='Round-trip time for the model (default: 50)')
+    parser.add_argument('--bandwidth-mb', type=float, default=20.0, help='MB/s for the model (default: 20)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    chunk_size = parse_size(args.chunk_size)
+    total_size = args.size_mb * 1024 * 1024
+    chunks = (total_size + chunk_size - 1) // chunk_size
+    max_bytes = parse_size(args.max_request_size)
+    gaps = [parse_size(g, allow_zero=True) for g in args.gaps.split(',')]
+    bandwidth = args.bandwidth_mb * 1024 * 1024
+
+    print(f"{'pattern':<12} {'gap':>9} {'requests':>9} {'needed MB':>10} {'wasted MB':>10} {'model s':>9} {'plan ms':>8}")
+    for name, indexes in change_patterns(chunks, rng):
+        needed = to_ranges(indexes, chunk_size, total_size)
+        needed_bytes = range_bytes(coalesce_ranges(needed))
+        for gap in gaps:
+            started = time.perf_counter()
+            requests = coalesce_ranges(needed, gap, max_bytes)
+            plan_ms = (time.perf_counter() - started) * 1000
+            fetched = range_bytes(requests)
+            model = len(requests) * args.rtt_ms / 1000 + fetched / bandwidth
+            print(
+                f"{name:<12} {gap:>9} {len(requests):>9} {needed_bytes / 1048576:>10.1f} "
+                f"{(fetched - needed_bytes) / 1048576:>10.1f} {model:>9.1f} {plan_ms:>8.2f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Measure hash throughput of every available algorithm on this host.
+
+    python benchmarks/bench_hashes.py --size-mb 256
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'ifetch'))
+
+from chunking import parse_size  # noqa: E402
+from hashing import ALGORITHMS, OPTIONAL_ALGORITHMS  # noqa: E402
+
+
+def throughput(algorithm, data: memoryview, block_size: int, min_seconds: float) -> float:
+    """Hash ``data`` in ``block_size`` pieces repeatedly and return MB/s."""
+    processed = 0
+    started = time.perf_counter()
+    while True:
+        for offset in range(0, len(data), block_size):
+            algorithm.digest(data[offset:offset + block_size])
+        processed += len(data)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return processed / (1024 * 1024) / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=64, help='Size of the test buffer (default: 64)')
+    parser.add_argument(
+        '--block-sizes',
+        default='64K,1M,8M',
+        help='Comma-separated buffer sizes hashed at once (default: 64K,1M,8M)'
+    )
+    parser.add_argument('--min-seconds', type=float, default=1.0, help='Minimum time per measurement')
+    args = parser.parse_args()
+
+    block_sizes = [parse_size(b) for b in args.block_sizes.split(',')]
+    data = memoryview(os.urandom(args.size_mb * 1024 * 1024))
+
+    header = f"{'algorithm':<10}" + ''.join(f"{str(b // 1024) + 'K':>12}" for b in block_sizes)
+    print(header)
+    print('-' * len(header))
+    for name, algorithm in ALGORITHMS.items():
+        rates = [throughput(algorithm, data, b, args.min_seconds) for b in block_sizes]
+        print(f"{name:<10}" + ''.join(f"{r:>8.0f}MB/s" for r in rates))
+
+    missing = [f"{name} (pip install {pkg})" for name, pkg in OPTIONAL_ALGORITHMS.items() if name not in ALGORITHMS]
+    if missing:
+        print(f"\nNot installed: {', '.join(missing)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Fetch scattered ranges with and without multi-range requests.
+
+A local server answers ``Range: bytes=a-b,c-d`` in one of several ways:
+``multipart`` (multipart/byteranges), ``merge`` (one 206 spanning every
+range), ``first`` (only the first range) or ``ignore`` (200 with the whole
+file). For each mode the script fetches the same scattered ranges through
+MultiRangeFetcher, falls back to single-range requests for whatever was not
+delivered, checks every byte and prints request counts and timings. A
+per-request delay stands in for the round trip to a remote server.
+
+    python benchmarks/bench_multirange.py --ranges 200 --rtt-ms 20
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'ifetch'))
+
+from multirange import MultiRangeFetcher  # noqa: E402
+from transport import get_transport  # noqa: E402
+
+BOUNDARY = 'ifetch-bench-boundary'
+
+
+class MultiRangeHandler(BaseHTTPRequestHandler):
+    """Serves ``server.payload``; ``server.mode`` picks the multi-range behavior."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        time.sleep(server.delay)
+        data = server.payload
+        ranges = [
+            (int(a), min(int(b), len(data) - 1))
+            for a, b in re.findall(r'(\d+)-(\d+)', self.headers.get('Range', ''))
+        ]
+        if not ranges or (len(ranges) > 1 and server.mode == 'ignore'):
+            self.send_body(200, data, {})
+            return
+        if len(ranges) > 1 and server.mode == 'merge':
+            ranges = [(ranges[0][0], ranges[-1][1])]
+        if len(ranges) == 1 or server.mode == 'first':
+            start, end = ranges[0]
+            self.send_body(206, data[start:end + 1], {'Content-Range': f'bytes {start}-{end}/{len(data)}'})
+            return
+
+        parts = []
+        for start, end in ranges:
+            parts.append(
+                f'\r\n--{BOUNDARY}\r\nContent-Type: application/octet-stream\r\n'
+                f'Content-Range: bytes {start}-{end}/{len(data)}\r\n\r\n'.encode()
+            )
+            parts.append(data[start:end + 1])
+        parts.append(f'\r\n--{BOUNDARY}--\r\n'.encode())
+        self.send_body(206, b''.join(parts), {'Content-Type': f'multipart/byteranges; boundary={BOUNDARY}'})
+
+    def send_body(self, status: int, body: bytes, headers: dict) -> None:
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client dropped a refused full-body answer
+
+
+def start_server(payload: bytes, delay: float) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MultiRangeHandler)
+    server.daemon_threads = True
+    server.payload = payload
+    server.delay = delay
+    server.mode = 'multipart'
+    server.lock = threading.Lock()
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def scattered_ranges(size: int, count: int, length: int, rng: random.Random):
+    starts = sorted(rng.sample(range(0, size - length, length), count))
+    return [(s, s + length - 1) for s in starts]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=64, help='Served file size (default: 64)')
+    parser.add_argument('--ranges', type=int, default=200, help='Scattered ranges to fetch (default: 200)')
+    parser.add_argument('--range-kb', type=int, default=64, help='Length of each range (default: 64)')
+    parser.add_argument('--max-ranges', type=int, default=32, help='Ranges per request (default: 32)')
+    parser.add_argument('--rtt-ms', type=float, default=20.0, help='Delay per request (default: 20)')
+    parser.add_argument('--transport', default='requests', help='Transport backend (default: requests)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    payload = os.urandom(args.size_mb * 1024 * 1024)
+    ranges = scattered_ranges(len(payload), args.ranges, args.range_kb * 1024, rng)
+    server = start_server(payload, args.rtt_ms / 1000)
+    url = f'http://127.0.0.1:{server.server_port}/payload'
+    transport = get_transport(args.transport)
+
+    print(f"{'server mode':<12} {'batching':>8} {'requests':>9} {'multi':>6} {'single':>7} {'seconds':>8}  result")
+    for mode in ('multipart', 'merge', 'first', 'ignore'):
+        for max_ranges in (1, args.max_ranges):
+            server.mode = mode
+            server.requests = 0
+            fetcher = MultiRangeFetcher(transport, max_ranges)
+            output = bytearray(len(payload))
+
+            def write_at(offset: int, data: bytes) -> None:
+                output[offset:offset + len(data)] = data
+
+            started = time.perf_counter()
+            _, leftover = fetcher.fetch(url, ranges, write_at)
+            for start, end in leftover:
+                with transport.get(url, start, end) as response:
+                    write_at(start, b''.join(response.iter_content()))
+            elapsed = time.perf_counter() - started
+
+            ok = all(output[s:e + 1] == payload[s:e + 1] for s, e in ranges)
+            stats = fetcher.stats()
+            print(
+                f"{mode:<12} {max_ranges:>8} {server.requests:>9} {stats['requests']:>6} {len(leftover):>7} "
+                f"{elapsed:>8.3f}  {'ok' if ok else 'MISMATCH'}"
+                f"{' (fallback: ' + next(iter(stats['unsupported_hosts'].values())) + ')' if stats['unsupported_hosts'] else ''}"
+            )
+            if not ok:
+                sys.exit(1)
+
+    transport.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Stream a body through the delta engine with and without pooled buffers.
+
+A local server serves a random file. The script fetches it a number of
+times through FileChunker.stream_delta into a temporary file, once reading
+``iter_content`` pieces (a new bytes object per piece, copied again by the
+chunker) and once receiving straight into a pooled buffer with
+``readinto`` (chunk-aligned views, written with ``pwrite``). It checks the
+written file and prints throughput and peak traced memory per run.
+
+    python benchmarks/bench_readinto.py --size-mb 256 --chunk-kb 1024
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'ifetch'))
+
+from bufferpool import BufferPool, read_chunks  # noqa: E402
+from chunker import FileChunker  # noqa: E402
+from transport import get_transport  # noqa: E402
+from writer import PositionalFile  # noqa: E402
+
+
+class PayloadHandler(BaseHTTPRequestHandler):
+    """Serves ``server.payload`` in full."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        data = self.server.payload
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_server(payload: bytes) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PayloadHandler)
+    server.daemon_threads = True
+    server.payload = payload
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=256, help='Served file size (default: 256)')
+    parser.add_argument('--chunk-kb', type=int, default=1024, help='Chunk size (default: 1024)')
+    parser.add_argument('--runs', type=int, default=3, help='Fetches per mode (default: 3)')
+    parser.add_argument('--transport', default='requests', help='Transport backend (default: requests)')
+    args = parser.parse_args()
+
+    payload = os.urandom(args.size_mb * 1024 * 1024)
+    server = start_server(payload)
+    url = f'http://127.0.0.1:{server.server_port}/payload'
+    transport = get_transport(args.transport)
+    chunker = FileChunker(args.chunk_kb * 1024)
+    pool = BufferPool()
+
+    print(f"{'mode':<12} {'MB/s':>8} {'peak MB':>8}  result")
+    with tempfile.TemporaryDirectory() as tmp:
+        target = Path(tmp) / 'out.bin'
+        for mode in ('iter_content', 'readinto'):
+            best = 0.0
+            peak = 0
+            for _ in range(args.runs):
+                with target.open('wb') as f:
+                    f.truncate(len(payload))
+                with target.open('r+b') as f, transport.get(url) as response:
+                    if mode == 'readinto':
+                        body = read_chunks(response.readinto, pool, chunker.chunk_size)
+                    else:
+                        body = response.iter_content(chunk_size=chunker.chunk_size)
+                    tracemalloc.start()
+                    started = time.perf_counter()
+                    chunker.stream_delta(body, chunker.new_index(), PositionalFile(f).write_at)
+                    elapsed = time.perf_counter() - started
+                    peak = max(peak, tracemalloc.get_traced_memory()[1])
+                    tracemalloc.stop()
+                best = max(best, len(payload) / elapsed / 1e6)
+            ok = target.read_bytes() == payload
+            print(f"{mode:<12} {best:>8.0f} {peak / 1e6:>8.1f}  {'ok' if ok else 'MISMATCH'}")
+            if not ok:
+                sys.exit(1)
+
+    transport.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Measure the throughput of rolling-checksum delta matching.
+
+The delta engine runs on the download path, so it has to keep up with the
+network. For a few edit patterns the script streams the edited version of
+a random file through FileChunker.stream_delta with rolling matching and
+with plain aligned matching, checks that applying the result rebuilds the
+new version, and prints throughput and the bytes reported as changed.
+
+    python benchmarks/bench_rolling.py --size-mb 64 --chunk-kb 64
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'ifetch'))
+
+from chunker import FileChunker  # noqa: E402
+
+
+def edit_patterns(data: bytes, rng: random.Random):
+    """Yield (name, edited data) pairs, from no change to all-new content."""
+    size = len(data)
+    yield 'unchanged', data
+    edited = bytearray(data)
+    for _ in range(16):
+        pos = rng.randrange(size - 64)
+        edited[pos:pos + 64] = rng.randbytes(64)
+    yield 'overwrite-16x64B', bytes(edited)
+    yield 'insert-100B-middle', data[:size // 2] + rng.randbytes(100) + data[size // 2:]
+    edited = data
+    for _ in range(8):
+        pos = rng.randrange(len(edited))
+        edited = edited[:pos] + rng.randbytes(1000) + edited[pos + 500:]
+    yield 'shift-8x', edited
+    yield 'all-new', rng.randbytes(size)
+
+
+def run(chunker: FileChunker, label: str, existing, old: bytes, new: bytes) -> None:
+    rebuilt = bytearray(old[:len(new)].ljust(len(new), b'\0'))
+
+    def write_at(offset: int, data: bytes) -> None:
+        rebuilt[offset:offset + len(data)] = data
+
+    blocks = (new[i:i + 65536] for i in range(0, len(new), 65536))
+    started = time.perf_counter()
+    result = chunker.stream_delta(blocks, existing, write_at)
+    elapsed = time.perf_counter() - started
+    ok = rebuilt == new
+    print(
+        f"{label:<28} {len(new) / elapsed / 1e6:8.1f} MB/s  "
+        f"changed {result.bytes_changed:>10} B  {'ok' if ok else 'MISMATCH'}"
+    )
+    if not ok:
+        sys.exit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=64, help='Size of the random file (default: 64)')
+    parser.add_argument('--chunk-kb', type=int, default=64, help='Chunk size (default: 64)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    old = rng.randbytes(args.size_mb * 1024 * 1024)
+    patterns = list(edit_patterns(old, rng))
+    chunk_size = args.chunk_kb * 1024
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path = Path(tmp) / 'old.bin'
+        old_path.write_bytes(old)
+        for rolling in (False, True):
+            chunker = FileChunker(chunk_size, rolling=rolling)
+            existing = chunker.get_file_chunks(old_path)
+            mode = 'rolling' if rolling else 'aligned'
+            for name, new in patterns:
+                run(chunker, f"{mode} {name}", existing, old, new)
+            run(chunker, f"{mode} empty-index", chunker.new_index(), b'', patterns[-1][1])
+
+
+if __name__ == '__main__':
+    main()
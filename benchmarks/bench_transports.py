@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Compare HTTP transport backends on ranged downloads.
+
+Each installed backend fetches a file as concurrent range requests and the
+script prints throughput, request rate and connection counts. By default it
+serves random bytes from a local range-capable HTTP/1.1 server, which
+measures client overhead; pass --url to measure a real server (HTTP/2 is
+only negotiated over HTTPS).
+
+    python benchmarks/bench_transports.py --size-mb 256 --range-mb 8 --workers 4
+    python benchmarks/bench_transports.py --url https://example.com/big.bin --size-mb 100
+"""
+import argparse
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'ifetch'))
+
+from transport import TRANSPORTS, get_transport  # noqa: E402
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves ``server.payload`` with single-range support and keep-alive."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        data = self.server.payload
+        start, end = 0, len(data) - 1
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2) or end), end)
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(data)}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        view = memoryview(data)[start:end + 1]
+        for offset in range(0, len(view), 1024 * 1024):
+            self.wfile.write(view[offset:offset + 1024 * 1024])
+
+
+def start_server(size: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    server.daemon_threads = True
+    server.payload = os.urandom(size)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fetch_all(transport, url: str, size: int, range_size: int, workers: int) -> int:
+    """Download ``size`` bytes of ``url`` as ranges; return the bytes received."""
+    def fetch(start: int) -> int:
+        received = 0
+        with transport.get(url, start, min(start + range_size, size) - 1) as response:
+            for data in response.iter_content(1024 * 1024):
+                received += len(data)
+        return received
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(fetch, range(0, size, range_size)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=256, help='Bytes to fetch (default: 256)')
+    parser.add_argument('--range-mb', type=float, default=8, help='Size of each range request (default: 8)')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent range requests (default: 4)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per backend, best is shown (default: 3)')
+    parser.add_argument('--transports', default=','.join(TRANSPORTS), help='Comma-separated backends')
+    parser.add_argument('--url', help='Range-capable URL to fetch instead of the local server')
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    range_size = max(int(args.range_mb * 1024 * 1024), 1)
+    server = None
+    url = args.url
+    if not url:
+        server = start_server(size)
+        url = f'http://127.0.0.1:{server.server_port}/payload'
+
+    print(f"{'transport':<10} {'MB/s':>9} {'req/s':>8} {'best s':>8} {'requests':>9} {'connections':>12}")
+    for name in args.transports.split(','):
+        try:
+            transport = get_transport(name, max_per_host=args.workers)
+        except ValueError as e:
+            print(f"{name:<10} skipped: {e}")
+            continue
+        try:
+            best = None
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                received = fetch_all(transport, url, size, range_size, args.workers)
+                elapsed = time.perf_counter() - started
+                if received != size:
+                    raise RuntimeError(f"received {received} of {size} bytes")
+                best = elapsed if best is None else min(best, elapsed)
+            stats = transport.stats()
+            requests = (size + range_size - 1) // range_size
+            print(
+                f"{name:<10} {size / 1048576 / best:>9.1f} {requests / best:>8.1f} {best:>8.3f} "
+                f"{stats.get('requests', '-'):>9} {stats.get('connections_opened', '-'):>12}"
+            )
+        except Exception as e:
+            print(f"{name:<10} failed: {e}")
+        finally:
+            transport.close()
+
+    if server:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
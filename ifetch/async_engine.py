@@ -0,0 +1,265 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import aiohttp
+except ImportError:  # Optional dependency
+    aiohttp = None
+
+from utils import can_read_file
+
+
+class _BufferedResponse:
+    """Minimal stand-in for a streamed ``requests`` response over a body in memory."""
+
+    # Already paced by the rate limiter while it was fetched
+    prefetched = True
+
+    def __init__(self, body: bytes, url: str):
+        self.body = body
+        self.url = url
+        self.headers: Dict[str, str] = {'content-length': str(len(body))}
+
+    def iter_content(self, chunk_size: int = 65536) -> Iterator[bytes]:
+        for offset in range(0, len(self.body), chunk_size):
+            yield self.body[offset:offset + chunk_size]
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "_BufferedResponse":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class _PrefetchedItem:
+    """Drive item whose body was already downloaded by the async engine."""
+
+    prefetched = True
+
+    def __init__(self, item: Any, body: bytes, url: str):
+        self._item = item
+        self._body = body
+        self._url = url
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._item, name)
+
+    def open(self, **kwargs: Any) -> _BufferedResponse:
+        return _BufferedResponse(self._body, self._url)
+
+
+class _ByteBudget:
+    """Bounds the bytes of file bodies held in memory at once.
+
+    A reservation larger than the whole budget is granted when nothing else
+    is held, so no file can wait forever.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self, size: int) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: not self.used or self.used + size <= self.limit)
+            self.used += size
+
+    async def release(self, size: int) -> None:
+        async with self._cond:
+            self.used -= size
+            self._cond.notify_all()
+
+
+class AsyncEngine:
+    """asyncio traversal and transfer pipeline for a DownloadManager.
+
+    Folder listings and other pyicloud calls are blocking, so they run in a
+    small executor behind a metadata semaphore. File bodies are fetched with
+    aiohttp behind a separate data semaphore, so hundreds of small files can
+    be in flight on one thread. Each body then goes through the manager's
+    regular delta, checkpoint and report code in an apply executor of its
+    own, so long transfers never hold up listings and results match the
+    threaded engine. Bodies are held in memory from fetch to apply within a
+    total of ``max_memory`` bytes. Files larger than ``max_buffered`` are
+    handed to the threaded path as a whole, as are files whose async fetch
+    fails.
+    """
+
+    @staticmethod
+    def require() -> None:
+        """Check that aiohttp, which the engine runs on, is installed.
+
+        Raises:
+            ValueError: If aiohttp cannot be imported
+        """
+        if aiohttp is None:
+            raise ValueError("The asyncio engine needs the 'aiohttp' package (pip install aiohttp)")
+
+    def __init__(
+        self,
+        manager: Any,
+        max_connections: int = 100,
+        max_metadata: Optional[int] = None,
+        max_buffered: int = 16 * 1024 * 1024,
+        max_memory: int = 256 * 1024 * 1024
+    ):
+        """Initialize the engine.
+
+        Args:
+            manager: DownloadManager whose settings, caches and results are used
+            max_connections: Files whose bodies are downloaded at once
+            max_metadata: Concurrent blocking iCloud calls (default: the
+                manager's max_workers)
+            max_buffered: Largest file fetched into memory by the async path
+            max_memory: Most bytes of file bodies held in memory at once
+        """
+        self.require()
+        self.manager = manager
+        self.max_connections = max_connections
+        self.max_metadata = max_metadata or manager.max_workers
+        self.max_apply = manager.max_workers
+        self.max_buffered = min(max_buffered, max_memory)
+        if manager.segment_size:
+            # Files the threaded path would segment are left to it
+            self.max_buffered = min(self.max_buffered, 2 * manager.segment_size - 1)
+        self.max_memory = max_memory
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._apply_executor: Optional[ThreadPoolExecutor] = None
+        self._metadata: Optional[asyncio.Semaphore] = None
+        self._apply_slots: Optional[asyncio.Semaphore] = None
+        self._data: Optional[asyncio.Semaphore] = None
+        self._memory: Optional[_ByteBudget] = None
+        self._session: Any = None
+
+    def run(self, item: Any, local_path: Path) -> None:
+        """Process an item (file or folder tree) to completion."""
+        asyncio.run(self._run(item, local_path))
+
+    async def _run(self, item: Any, local_path: Path) -> None:
+        self._metadata = asyncio.Semaphore(self.max_metadata)
+        self._apply_slots = asyncio.Semaphore(self.max_apply)
+        self._data = asyncio.Semaphore(self.max_connections)
+        self._memory = _ByteBudget(self.max_memory)
+        connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.max_connections)
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=60)
+        with ThreadPoolExecutor(max_workers=self.max_metadata, thread_name_prefix='async-io') as executor, \
+                ThreadPoolExecutor(max_workers=self.max_apply, thread_name_prefix='async-apply') as apply_executor:
+            self._executor = executor
+            self._apply_executor = apply_executor
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                self._session = session
+                await self._process(item, local_path)
+
+    async def _blocking(self, func: Any, *args: Any) -> Any:
+        """Run a blocking iCloud call in the executor behind the metadata semaphore."""
+        async with self._metadata:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def _apply(self, func: Any, *args: Any) -> Any:
+        """Run local hashing, transfers and delta writes in the apply executor."""
+        async with self._apply_slots:
+            return await asyncio.get_running_loop().run_in_executor(self._apply_executor, func, *args)
+
+    async def _process(self, item: Any, local_path: Path) -> None:
+        logger = self.manager.logger
+        try:
+            if can_read_file(item):
+                await self._download(item, local_path)
+            elif hasattr(item, 'dir'):
+                contents = await self._blocking(item.dir)
+                if contents:
+                    local_path.mkdir(parents=True, exist_ok=True)
+                    children = await self._blocking(lambda: [(name, item[name]) for name in contents])
+                    self.manager._enqueue_urls((child, local_path / name) for name, child in children)
+                    await asyncio.gather(*(
+                        self._process(child, local_path / name) for name, child in children
+                    ))
+        except Exception as e:
+            logger.error(json.dumps({
+                "event": "processing_error",
+                "file": getattr(item, 'name', 'unknown'),
+                "error": str(e)
+            }))
+
+    async def _download(self, item: Any, local_path: Path) -> None:
+        manager = self.manager
+        with manager._download_lock:
+            if str(local_path) in manager._active_downloads:
+                return
+            manager._active_downloads.add(str(local_path))
+
+        try:
+            size = getattr(item, 'size', None) or 0
+            if size > self.max_buffered:
+                ok = await self._apply(manager.download_drive_item, item, local_path)
+            elif not hasattr(item, 'name') or not hasattr(item, 'open'):
+                ok = manager.download_drive_item(item, local_path)
+            elif await self._apply(manager._complete_without_download, item, local_path):
+                ok = True
+                manager.urls.discard(item)
+            else:
+                try:
+                    ok = await self._fetch_and_apply(item, local_path)
+                finally:
+                    manager.urls.discard(item)
+
+            if ok:
+                manager.logger.info(json.dumps({
+                    "event": "download_success",
+                    "file": getattr(item, 'name', 'unknown'),
+                    "path": str(local_path)
+                }))
+            else:
+                # Retried by the manager's final pass, after the traversal
+                manager._defer_file(item, local_path)
+        finally:
+            with manager._download_lock:
+                manager._active_downloads.discard(str(local_path))
+
+    async def _fetch_and_apply(self, item: Any, local_path: Path) -> bool:
+        """Fetch a body asynchronously and apply it through the delta engine.
+
+        The body's size is reserved from the memory budget before the fetch
+        and returned once it has been applied.
+        """
+        manager = self.manager
+        reserved = getattr(item, 'size', None) or 0
+        await self._memory.acquire(reserved)
+        try:
+            try:
+                url = await self._blocking(manager._resolve_url, item)
+                async with self._data:
+                    async with self._session.get(url) as response:
+                        response.raise_for_status()
+                        pieces = []
+                        received = 0
+                        async for data in response.content.iter_chunked(256 * 1024):
+                            received += len(data)
+                            if received > reserved:
+                                raise aiohttp.ClientPayloadError(
+                                    f"Body exceeds the {reserved} bytes reported for the file"
+                                )
+                            pieces.append(data)
+                            delay = manager.limiter.reserve(len(data))
+                            if delay:
+                                await asyncio.sleep(delay)
+                        body = b''.join(pieces)
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                manager.logger.warning(json.dumps({
+                    "event": "async_fetch_failed",
+                    "file": item.name,
+                    "error": str(e)
+                }))
+                # The threaded path retries and resumes with range requests
+                return await self._apply(manager._transfer, item, local_path)
+
+            return await self._apply(manager._transfer, _PrefetchedItem(item, body, url), local_path)
+        finally:
+            await self._memory.release(reserved)
@@ -0,0 +1,99 @@
+import threading
+from typing import Callable, Dict, Iterator, List
+
+
+class BufferPool:
+    """Reusable receive buffers shared by all transfers.
+
+    Buffers are grouped by size (one size per file chunk size in use). Up
+    to ``keep`` free buffers of each size are kept for the next transfer, as
+    long as all free buffers together stay within ``max_bytes``; beyond
+    that, released buffers are left to the garbage collector. Files with
+    huge chunks therefore do not pin that memory once their transfers end.
+    """
+
+    def __init__(self, keep: int = 8, max_bytes: int = 128 * 1024 * 1024):
+        """Initialize the pool.
+
+        Args:
+            keep: Free buffers kept per size, normally the number of
+                transfers that can run at once
+            max_bytes: Most bytes held in free buffers
+        """
+        self.keep = keep
+        self.max_bytes = max_bytes
+        self.free_bytes = 0
+        self._free: Dict[int, List[bytearray]] = {}
+        self._lock = threading.Lock()
+        self.allocated = 0
+        self.reused = 0
+
+    def acquire(self, size: int) -> bytearray:
+        """Take a buffer of ``size`` bytes, allocating one if none is free."""
+        with self._lock:
+            free = self._free.get(size)
+            if free:
+                self.reused += 1
+                self.free_bytes -= size
+                return free.pop()
+            self.allocated += 1
+        return bytearray(size)
+
+    def release(self, buffer: bytearray) -> None:
+        """Give a buffer back once nothing refers to its contents any more."""
+        with self._lock:
+            free = self._free.setdefault(len(buffer), [])
+            if len(free) < self.keep and self.free_bytes + len(buffer) <= self.max_bytes:
+                free.append(buffer)
+                self.free_bytes += len(buffer)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"allocated": self.allocated, "reused": self.reused, "free_bytes": self.free_bytes}
+
+
+def read_chunks(
+    readinto: Callable[[memoryview], int],
+    pool: BufferPool,
+    chunk_size: int,
+    start: int = 0,
+    read_size: int = 0
+) -> Iterator[memoryview]:
+    """Receive a body straight into a pooled buffer, one chunk at a time.
+
+    Pieces end at absolute multiples of ``chunk_size``, so each one is a
+    whole fixed-size chunk (only the first and last may be shorter) and the
+    chunker can use it without copying. Each view is only valid until the
+    next one is requested: the same buffer is then filled again.
+
+    Args:
+        readinto: Reads the next body bytes into a buffer; 0 at the end
+        pool: Pool providing the receive buffer
+        chunk_size: Chunk size of the file
+        start: Absolute offset of the first body byte
+        read_size: Most bytes asked for per ``readinto`` call (0 for a whole
+            chunk), so progress can be observed within a chunk
+
+    Yields:
+        Views of the buffer holding consecutive pieces of the body
+    """
+    buffer = pool.acquire(chunk_size)
+    view = memoryview(buffer)
+    step = read_size or chunk_size
+    position = start
+    try:
+        while True:
+            want = chunk_size - position % chunk_size
+            filled = 0
+            while filled < want:
+                received = readinto(view[filled:min(want, filled + step)])
+                if not received:
+                    break
+                filled += received
+            if filled:
+                yield view[:filled]
+                position += filled
+            if filled < want:
+                return
+    finally:
+        pool.release(buffer)
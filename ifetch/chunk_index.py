@@ -0,0 +1,223 @@
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class ChunkIndex:
+    """Compact, position-aware list of the chunks of one file.
+
+    Chunks are kept in parallel arrays: start offsets in an ``array('Q')``
+    and fixed-width binary digests packed into one ``bytearray``. Unlike a
+    ``{hash: (start, end)}`` dict, duplicate chunks keep all their positions
+    and a chunk costs ~24 bytes instead of a tuple plus a hex string.
+
+    Lookup by offset is O(1) while chunks have a uniform size (fixed
+    chunking) and a binary search otherwise. Lookup by digest uses a hash
+    table that is only built the first time it is needed.
+    """
+
+    def __init__(self, digest_size: int = 16, with_weak: bool = False, origin: int = 0):
+        """Initialize an empty index.
+
+        Args:
+            digest_size: Width of every digest in bytes
+            with_weak: Also store a 32-bit weak checksum per chunk for
+                rolling matches
+            origin: Offset of the first chunk, for an index covering only
+                the part of a file from ``origin`` on (see extend)
+        """
+        self.digest_size = digest_size
+        self.offsets = array('Q')
+        self.digests = bytearray()
+        self.weak = array('I') if with_weak else None
+        self.total_size = origin
+        self._uniform: Optional[int] = None   # Common chunk size, if any
+        self._ragged = False                  # Set once chunk sizes differ
+        self._by_digest: Optional[Dict[bytes, int]] = None
+        self._next_same: Optional[array] = None
+        self._by_weak: Optional[Dict[int, List[int]]] = None
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __bool__(self) -> bool:
+        return len(self.offsets) > 0
+
+    def append(self, offset: int, length: int, digest: bytes, weak: int = 0) -> None:
+        """Add the next chunk of the file.
+
+        Args:
+            offset: Start offset; must equal the end of the previous chunk
+            length: Chunk length in bytes
+            digest: Binary digest of ``digest_size`` bytes
+            weak: Weak checksum, stored when the index was created with_weak
+        """
+        if offset != self.total_size:
+            raise ValueError(f"Chunk at {offset} does not follow end of index at {self.total_size}")
+        if len(digest) != self.digest_size:
+            raise ValueError(f"Digest must be {self.digest_size} bytes, got {len(digest)}")
+
+        # A short chunk is fine as the last one; anything after it is ragged
+        if self.offsets and not self._ragged:
+            previous = offset - self.offsets[-1]
+            if self._uniform is None:
+                self._uniform = previous
+            elif previous != self._uniform:
+                self._ragged = True
+
+        self.offsets.append(offset)
+        self.digests += digest
+        if self.weak is not None:
+            self.weak.append(weak)
+        self.total_size = offset + length
+        self._by_digest = None
+        self._next_same = None
+        self._by_weak = None
+
+    def extend(self, other: "ChunkIndex") -> None:
+        """Append the chunks of an index that continues where this one ends."""
+        for i in range(len(other)):
+            weak = other.weak[i] if other.weak is not None else 0
+            self.append(other.offsets[i], other.length(i), other.digest(i), weak)
+
+    def start(self, i: int) -> int:
+        """Start offset of chunk ``i``."""
+        return self.offsets[i]
+
+    def end(self, i: int) -> int:
+        """Inclusive end offset of chunk ``i``."""
+        if i + 1 < len(self.offsets):
+            return self.offsets[i + 1] - 1
+        return self.total_size - 1
+
+    def length(self, i: int) -> int:
+        """Length of chunk ``i`` in bytes."""
+        return self.end(i) - self.offsets[i] + 1
+
+    def digest(self, i: int) -> bytes:
+        """Binary digest of chunk ``i``."""
+        width = self.digest_size
+        return bytes(self.digests[i * width:(i + 1) * width])
+
+    def index_at(self, offset: int) -> Optional[int]:
+        """Return the index of the chunk that starts exactly at ``offset``."""
+        count = len(self.offsets)
+        if not count or offset >= self.total_size or offset < self.offsets[0]:
+            return None
+
+        if not self._ragged:
+            size = self._uniform or self.total_size
+            i = (offset - self.offsets[0]) // size
+        else:
+            i = bisect_right(self.offsets, offset) - 1
+
+        if 0 <= i < count and self.offsets[i] == offset:
+            return i
+        return None
+
+    def digest_at(self, offset: int) -> Optional[bytes]:
+        """Return the digest of the chunk starting at ``offset``, if any."""
+        i = self.index_at(offset)
+        return None if i is None else self.digest(i)
+
+    def _build_digest_table(self) -> None:
+        table: Dict[bytes, int] = {}
+        next_same = array('q', [-1]) * len(self.offsets)
+        # Walk backwards so each table entry ends up pointing at the first
+        # occurrence and next_same chains the rest in offset order
+        for i in range(len(self.offsets) - 1, -1, -1):
+            key = self.digest(i)
+            next_same[i] = table.get(key, -1)
+            table[key] = i
+        self._by_digest = table
+        self._next_same = next_same
+
+    def find(self, digest: bytes) -> Optional[int]:
+        """Return the index of the first chunk with ``digest``."""
+        if self._by_digest is None:
+            self._build_digest_table()
+        return self._by_digest.get(digest)
+
+    def find_all(self, digest: bytes) -> Iterator[int]:
+        """Yield the indexes of every chunk with ``digest`` in offset order."""
+        i = self.find(digest)
+        while i is not None and i >= 0:
+            yield i
+            i = self._next_same[i]
+
+    def __contains__(self, digest: bytes) -> bool:
+        return self.find(digest) is not None
+
+    def find_weak(self, weak: int) -> List[int]:
+        """Return the indexes of every chunk with weak checksum ``weak``."""
+        if self.weak is None:
+            return []
+        if self._by_weak is None:
+            table: Dict[int, List[int]] = {}
+            for i, value in enumerate(self.weak):
+                table.setdefault(value, []).append(i)
+            self._by_weak = table
+        return self._by_weak.get(weak, [])
+
+    def ranges(self, indices: Iterable[int]) -> List[Tuple[int, int]]:
+        """Convert chunk indexes to merged (start, end) byte ranges.
+
+        Consecutive chunks collapse into one range without building a
+        tuple per chunk first.
+        """
+        merged: List[Tuple[int, int]] = []
+        run_start = run_end = -1
+        for i in sorted(indices):
+            start, end = self.offsets[i], self.end(i)
+            if run_end >= 0 and start <= run_end + 1:
+                run_end = max(run_end, end)
+                continue
+            if run_end >= 0:
+                merged.append((run_start, run_end))
+            run_start, run_end = start, end
+        if run_end >= 0:
+            merged.append((run_start, run_end))
+        return merged
+
+    def __iter__(self) -> Iterator[Tuple[int, int, bytes]]:
+        """Yield (start, end, digest) for every chunk."""
+        for i in range(len(self.offsets)):
+            yield self.offsets[i], self.end(i), self.digest(i)
+
+    def to_record(self) -> Tuple[int, int, bytes, bytes, Optional[bytes]]:
+        """Serialize the index for storage.
+
+        Returns:
+            (digest_size, total_size, offsets, digests, weak) where the last
+            three are raw array bytes (weak is None without weak checksums)
+        """
+        weak = self.weak.tobytes() if self.weak is not None else None
+        return self.digest_size, self.total_size, self.offsets.tobytes(), bytes(self.digests), weak
+
+    @classmethod
+    def from_record(
+        cls,
+        digest_size: int,
+        total_size: int,
+        offsets: bytes,
+        digests: bytes,
+        weak: Optional[bytes] = None
+    ) -> 'ChunkIndex':
+        """Rebuild an index serialized with to_record."""
+        index = cls(digest_size, with_weak=weak is not None)
+        index.offsets.frombytes(offsets)
+        index.digests = bytearray(digests)
+        if weak is not None:
+            index.weak.frombytes(weak)
+        index.total_size = total_size
+
+        if len(index.digests) != len(index.offsets) * digest_size:
+            raise ValueError("Corrupt chunk index record")
+
+        count = len(index.offsets)
+        if count > 1:
+            index._uniform = index.offsets[1] - index.offsets[0]
+            index._ragged = any(
+                index.offsets[i + 1] - index.offsets[i] != index._uniform for i in range(1, count - 1)
+            )
+        return index
@@ -0,0 +1,179 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from chunk_index import ChunkIndex
+
+
+class ChunkStore:
+    """Content-addressed index of the chunks of every file in a destination tree.
+
+    Maps a chunk digest to the files and offsets holding it, so data that
+    already exists anywhere in the mirror can be copied locally instead of
+    downloaded. Each file also keeps the iCloud identity it was downloaded
+    from, which lets a renamed or moved remote file be matched to its old
+    local copy, and the content signature of its download token, which
+    matches copies and re-exported files. Rows are hints only: callers must
+    verify a chunk's digest after reading it.
+    """
+
+    DIR_NAME = '.ifetch'
+    FILE_NAME = 'chunks.sqlite'
+
+    def __init__(self, root: Path):
+        """Open (or create) the store for a destination tree.
+
+        Args:
+            root: Destination directory the store belongs to
+        """
+        self.root = root
+        self.path = root / self.DIR_NAME / self.FILE_NAME
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS files ('
+                ' path TEXT PRIMARY KEY, chunking TEXT, size INTEGER,'
+                ' docwsid TEXT, etag TEXT, remote_size INTEGER, date_modified TEXT)'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS chunks ('
+                ' chunking TEXT, digest BLOB, path TEXT, offset INTEGER, length INTEGER)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS chunks_digest ON chunks (chunking, digest)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS chunks_path ON chunks (path, offset)')
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(files)')}
+            if 'signature' not in columns:
+                # Stores created before content signatures were recorded
+                self._conn.execute('ALTER TABLE files ADD COLUMN signature TEXT')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS files_docwsid ON files (docwsid)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS files_signature ON files (signature)')
+            self._conn.commit()
+
+    def _key(self, file_path: Path) -> str:
+        try:
+            return str(file_path.relative_to(self.root))
+        except ValueError:
+            return str(file_path)
+
+    def _resolve(self, key: str) -> Path:
+        path = Path(key)
+        return path if path.is_absolute() else self.root / path
+
+    def add_file(
+        self,
+        file_path: Path,
+        chunking: str,
+        index: ChunkIndex,
+        remote: Optional[Dict[str, Any]] = None,
+        signature: Optional[str] = None
+    ) -> None:
+        """Record the chunks of a file, replacing what was known about it.
+
+        Args:
+            file_path: File the index describes
+            chunking: Chunker description the index was built with
+            index: Chunk index of the file's current content
+            remote: iCloud identity the file was downloaded from (see
+                utils.remote_identity)
+            signature: Content signature of the download (see
+                utils.content_signature)
+        """
+        key = self._key(file_path)
+        remote = remote or {}
+        rows = [(chunking, digest, key, start, end - start + 1) for start, end, digest in index]
+        with self._lock:
+            self._conn.execute('DELETE FROM chunks WHERE path = ?', (key,))
+            self._conn.execute(
+                'INSERT OR REPLACE INTO files'
+                ' (path, chunking, size, docwsid, etag, remote_size, date_modified, signature)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    key, chunking, index.total_size, remote.get('docwsid'), remote.get('etag'),
+                    remote.get('size'), remote.get('date_modified'), signature
+                )
+            )
+            self._conn.executemany(
+                'INSERT INTO chunks (chunking, digest, path, offset, length) VALUES (?, ?, ?, ?, ?)', rows
+            )
+            self._conn.commit()
+
+    def remove_file(self, file_path: Path) -> None:
+        """Forget a file and its chunks."""
+        key = self._key(file_path)
+        with self._lock:
+            self._conn.execute('DELETE FROM chunks WHERE path = ?', (key,))
+            self._conn.execute('DELETE FROM files WHERE path = ?', (key,))
+            self._conn.commit()
+
+    def locate(self, digest: bytes, chunking: str) -> Iterator[Tuple[Path, int, int]]:
+        """Yield (path, offset, length) of every known copy of a chunk."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT path, offset, length FROM chunks WHERE chunking = ? AND digest = ?',
+                (chunking, digest)
+            ).fetchall()
+        for key, offset, length in rows:
+            yield self._resolve(key), offset, length
+
+    def find_renamed(
+        self,
+        remote: Dict[str, Any],
+        file_path: Path,
+        signature: Optional[str] = None
+    ) -> Optional[Path]:
+        """Return another local file downloaded from the same remote content.
+
+        A renamed or moved file keeps its document id, size and modification
+        date; the etag is ignored because it also changes on a rename. A
+        copy or re-export gets a new document id, so files with the same
+        content signature and size are matched as well.
+        """
+        key = self._key(file_path)
+        with self._lock:
+            row = None
+            if remote.get('docwsid'):
+                row = self._conn.execute(
+                    'SELECT path FROM files WHERE docwsid = ? AND remote_size = ? AND date_modified IS ?'
+                    ' AND path != ? LIMIT 1',
+                    (remote['docwsid'], remote.get('size'), remote.get('date_modified'), key)
+                ).fetchone()
+            if row is None and signature:
+                row = self._conn.execute(
+                    'SELECT path FROM files WHERE signature = ? AND remote_size = ? AND path != ? LIMIT 1',
+                    (signature, remote.get('size'), key)
+                ).fetchone()
+        return self._resolve(row[0]) if row else None
+
+    def manifest(self, file_path: Path, chunking: str) -> Optional[ChunkIndex]:
+        """Rebuild the chunk index recorded for a file, if it used ``chunking``."""
+        key = self._key(file_path)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT chunking, size FROM files WHERE path = ?', (key,)
+            ).fetchone()
+            if row is None or row[0] != chunking:
+                return None
+            chunks = self._conn.execute(
+                'SELECT offset, length, digest FROM chunks WHERE path = ? ORDER BY offset', (key,)
+            ).fetchall()
+
+        if not chunks:
+            return None
+        index = ChunkIndex(len(chunks[0][2]))
+        try:
+            for offset, length, digest in chunks:
+                index.append(offset, length, digest)
+        except ValueError:
+            return None
+        return index if index.total_size == row[1] else None
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -1,20 +1,115 @@
 from pathlib import Path
-from typing import List, Tuple, Dict, Optional, Any
-import hashlib
+from concurrent.futures import Executor
+from typing import List, Tuple, Optional, Any, Callable, Iterable, Iterator
+import zlib
+
+from models import DeltaResult
+from chunk_index import ChunkIndex
+from chunking import AdaptiveChunking, FixedChunking, parse_chunk_spec
+from hashing import get_algorithm
+from fileio import iter_file_blocks
+from ranges import coalesce_ranges
+
+
+class DeltaInterrupted(Exception):
+    """Raised when the remote stream breaks in the middle of a delta pass.
+
+    Attributes:
+        position: First byte offset that was not processed
+        result: Delta result accumulated up to ``position``
+    """
+
+    def __init__(self, position: int, result: DeltaResult):
+        super().__init__(f"Remote stream interrupted at byte {position}")
+        self.position = position
+        self.result = result
 
 
 class FileChunker:
     """Handles file chunking and differential update detection."""
 
-    def __init__(self, chunk_size: int = 1024 * 1024):
+    # Modulus of the Adler-32 weak checksum used for rolling matches
+    ADLER_MOD = 65521
+    # Windows looked ahead for a block still in place before sliding
+    ROLLING_LOOKAHEAD = 4
+    # Byte range hashed by one pool task when a file is hashed in parallel
+    PARALLEL_SEGMENT = 64 * 1024 * 1024
+
+    def __init__(
+        self,
+        chunk_size: int = 1024 * 1024,
+        rolling: bool = False,
+        strategy: Any = None,
+        hash_algorithm: str = 'md5',
+        pool: Optional[Executor] = None
+    ):
         """Initialize the chunker with a specific chunk size.
 
         Args:
             chunk_size: Size of each chunk in bytes (default: 1MB)
+            rolling: Match local blocks at any offset of the remote stream
+                using a rolling weak checksum (rsync-style)
+            strategy: Chunking strategy from the chunking module; defaults
+                to fixed-size chunks of ``chunk_size``. With AdaptiveChunking
+                use for_size() to get the chunker for a particular file
+            hash_algorithm: Name of the hashing backend for chunk digests
+            pool: Executor shared by all files for parallel hashing of
+                large local files (fixed-size chunking only)
+        """
+        self.hash = get_algorithm(hash_algorithm)
+        self.pool = pool
+        self.strategy = strategy or FixedChunking(chunk_size)
+        self.chunk_size = self.strategy.chunk_size
+        self.rolling = rolling
+        self._sized: dict = {}
+
+        if rolling and not isinstance(self.strategy, (FixedChunking, AdaptiveChunking)):
+            raise ValueError("Rolling checksum matching requires fixed-size chunks")
+
+    @classmethod
+    def from_spec(cls, spec: Any, rolling: bool = False, hash_algorithm: str = 'md5') -> "FileChunker":
+        """Create a chunker from a ``--chunk-size`` value (size or strategy spec)."""
+        return cls(rolling=rolling, strategy=parse_chunk_spec(spec), hash_algorithm=hash_algorithm)
+
+    def for_size(self, file_size: int, previous: Optional[str] = None) -> "FileChunker":
+        """Return the chunker to use for a file of ``file_size`` bytes.
+
+        Only adaptive chunking depends on the size; other strategies return
+        this chunker unchanged.
+
+        Args:
+            file_size: Size of the file in bytes
+            previous: describe() of the chunker used for this file before, so
+                its chunk size can be kept and indexes stay aligned
         """
-        self.chunk_size = chunk_size
+        if not isinstance(self.strategy, AdaptiveChunking):
+            return self
+
+        previous_size = None
+        if previous:
+            try:
+                previous_strategy = parse_chunk_spec(previous.split('/')[0])
+            except ValueError:
+                previous_strategy = None
+            if isinstance(previous_strategy, FixedChunking):
+                previous_size = previous_strategy.chunk_size
 
-    def get_file_chunks(self, file_path: Path) -> Dict[str, Tuple[int, int]]:
+        size = self.strategy.size_for(file_size, previous_size)
+        chunker = self._sized.get(size)
+        if chunker is None:
+            chunker = FileChunker(size, self.rolling, hash_algorithm=self.hash.name, pool=self.pool)
+            self._sized[size] = chunker
+        return chunker
+
+    def describe(self) -> str:
+        """Describe the settings that chunk indexes depend on (for caches)."""
+        return f"{self.strategy.describe()}/{self.hash.name}" + ('/rolling' if self.rolling else '')
+
+    def new_index(self, origin: int = 0) -> ChunkIndex:
+        """Create an empty chunk index matching this chunker's settings."""
+        return ChunkIndex(self.hash.digest_size, with_weak=self.rolling, origin=origin)
+
+    def get_file_chunks(self, file_path: Path) -> ChunkIndex:
         """
         Analyze an existing file and return its chunks with hashes.
 
@@ -22,89 +117,354 @@ class FileChunker:
             file_path: Path to the file to analyze
 
         Returns:
-            Dictionary mapping chunk hashes to (start, end) positions
+            ChunkIndex with the offset and digest of every chunk (plus weak
+            checksums in rolling mode)
         """
-        chunks = {}
+        index = self.new_index()
 
         if not file_path.exists() or file_path.stat().st_size == 0:
-            return chunks
+            return index
 
-        with file_path.open('rb') as f:
+        if isinstance(self.strategy, AdaptiveChunking):
+            return self.for_size(file_path.stat().st_size).get_file_chunks(file_path)
+
+        if not isinstance(self.strategy, FixedChunking):
+            # Content-defined boundaries depend on everything before them
             position = 0
-            while True:
-                chunk_data = f.read(self.chunk_size)
-                if not chunk_data:
-                    break
+            for chunk_data in self.strategy.split(iter_file_blocks(file_path)):
+                index.append(position, len(chunk_data), self.hash.digest(chunk_data))
+                position += len(chunk_data)
+            return index
 
-                chunk_hash = hashlib.md5(chunk_data).hexdigest()
-                chunk_size = len(chunk_data)
-                chunks[chunk_hash] = (position, position + chunk_size - 1)
-                position += chunk_size
+        size = file_path.stat().st_size
+        segment = max(self.PARALLEL_SEGMENT // self.chunk_size, 1) * self.chunk_size
+        if self.pool is None or size <= segment:
+            segments = [self._hash_segment(file_path, 0, size)]
+        else:
+            # hashlib and zlib release the GIL on large buffers, so threads
+            # hash separate byte ranges on separate cores
+            futures = [
+                self.pool.submit(self._hash_segment, file_path, start, min(start + segment, size))
+                for start in range(0, size, segment)
+            ]
+            segments = [future.result() for future in futures]
 
+        position = 0
+        for chunks in segments:
+            for length, digest, weak in chunks:
+                index.append(position, length, digest, weak)
+                position += length
+
+        return index
+
+    def _hash_segment(self, file_path: Path, start: int, end: int) -> List[Tuple[int, bytes, int]]:
+        """Hash the fixed-size chunks in [start, end) of a file.
+
+        Returns:
+            List of (length, digest, weak checksum) in offset order
+        """
+        digest = self.hash.digest
+        chunks = []
+        # Blocks are exactly one chunk: hash the views without copying
+        for view in iter_file_blocks(file_path, self.chunk_size, start=start, end=end):
+            weak = zlib.adler32(view) if self.rolling else 0
+            chunks.append((len(view), digest(view), weak))
         return chunks
 
-    def find_changed_chunks(
+    def stream_delta(
         self,
-        response: Any,
-        existing_chunks: Dict[str, Tuple[int, int]]
-    ) -> List[Tuple[int, int]]:
+        blocks: Iterable[bytes],
+        existing_chunks: ChunkIndex,
+        write_at: Optional[Callable[[int, bytes], None]],
+        pbar: Any = None,
+        start: int = 0
+    ) -> DeltaResult:
         """
-        Compare a remote file to local chunks and identify ranges that need downloading.
+        Hash a remote body as it arrives and write only the chunks that differ.
+
+        Remote chunks are cut by the chunking strategy and compared with the
+        local chunk at the same offset. Mismatched chunks are handed to
+        ``write_at`` in the same pass, so the remote body is read exactly
+        once. Chunks whose content exists elsewhere in the local copy count
+        as relocated rather than changed. In rolling mode local blocks are
+        matched at any byte offset instead.
 
         Args:
-            response: The file download response
-            existing_chunks: Dictionary of existing chunks from get_file_chunks
+            blocks: Iterable of remote body pieces (e.g. ``response.iter_content()``)
+            existing_chunks: ChunkIndex of the local copy from get_file_chunks
+            write_at: Callback writing data at an absolute offset, or None to
+                only detect changes
+            pbar: Optional progress bar updated with the bytes received
+            start: Absolute offset of the first byte in ``blocks``
 
         Returns:
-            List of (start, end) byte ranges that need to be downloaded
-        """
-        if not existing_chunks:
-            total_size = int(response.headers.get('content-length', 0))
-            if total_size > 0:
-                return [(0, total_size - 1)]
-            return []
+            DeltaResult describing the changed ranges; its ``index`` holds the
+            remote chunks read, starting at ``start``
 
-        total_size = int(response.headers.get('content-length', 0))
+        Raises:
+            DeltaInterrupted: If reading ``blocks`` fails part-way; its result
+                covers the whole chunks processed before the failure
+        """
+        if isinstance(self.strategy, AdaptiveChunking):
+            raise ValueError("Adaptive chunking needs the file size; use for_size() first")
+        if self.rolling and existing_chunks and existing_chunks.weak is not None:
+            return self._rolling_delta(blocks, existing_chunks, write_at, pbar, start)
+        # Without local blocks to look for, the aligned pass gives the same result
 
-        # Save current position to return to it after analysis
-        current_pos = response.raw.tell()
+        result = DeltaResult()
+        remote = self.new_index(origin=start)
+        result.index = remote
+        position = start
+        hash_digest = self.hash.digest
 
-        # Create a list of all byte positions that need downloading
-        changed_ranges = []
-        position = 0
+        def received() -> Iterator[bytes]:
+            for data in blocks:
+                if data and pbar is not None:
+                    pbar.update(len(data))
+                yield data
 
-        response.raw.seek(0)
-        while position < total_size:
-            chunk_data = response.raw.read(self.chunk_size)
-            if not chunk_data:
+        chunks = self.strategy.split(received(), start)
+        while True:
+            try:
+                chunk_data = next(chunks)
+            except StopIteration:
                 break
+            except Exception as e:
+                raise DeltaInterrupted(position, result) from e
 
-            chunk_hash = hashlib.md5(chunk_data).hexdigest()
-            chunk_size = len(chunk_data)
+            chunk_len = len(chunk_data)
+            digest = hash_digest(chunk_data)
+            if existing_chunks.digest_at(position) != digest:
+                if write_at is not None:
+                    write_at(position, chunk_data)
+                if digest in existing_chunks:
+                    # Same content exists locally at another offset
+                    result.bytes_relocated += chunk_len
+                else:
+                    result.add_changed(position, position + chunk_len - 1)
+            remote.append(position, chunk_len, digest, zlib.adler32(chunk_data) if self.rolling else 0)
+            result.bytes_received += chunk_len
+            position += chunk_len
 
-            # If this chunk doesn't exist locally or is at a different position
-            if chunk_hash not in existing_chunks:
-                changed_ranges.append((position, position + chunk_size - 1))
+        return result
 
-            position += chunk_size
+    def _rolling_delta(
+        self,
+        blocks: Iterable[bytes],
+        existing_chunks: ChunkIndex,
+        write_at: Optional[Callable[[int, bytes], None]],
+        pbar: Any,
+        start: int
+    ) -> DeltaResult:
+        """
+        Stream delta that finds local blocks at any offset of the remote body.
 
-        # Restore the original position
-        response.raw.seek(current_pos)
+        Windows of chunk_size bytes are compared with the local blocks, one
+        window after the other, using the Adler-32 checksum and then the
+        strong chunk hash. Only when a window differs and the following one
+        is not found either (so data was inserted or removed) does the
+        window slide one byte at a time, updating its checksum in O(1), to
+        find where the local data resumes. That Python loop is slow, so
+        slides are kept short; while nothing is found, the scan steps over
+        ever longer stretches of literal data window by window instead.
 
-        # Optimize the ranges by merging adjacent or overlapping ranges
-        if changed_ranges:
-            changed_ranges.sort()
-            optimized = [changed_ranges[0]]
+        Matched blocks are taken from the local copy (and only rewritten
+        when they moved); the bytes between matches are literal data and
+        reported as changed ranges.
+        """
+        n = self.chunk_size
+        mod = self.ADLER_MOD
+        hash_digest = self.hash.digest
+        result = DeltaResult()
+        # A block shorter than chunk_size can only be the tail of the local file
+        last = len(existing_chunks) - 1
+        tail = last if last >= 0 and existing_chunks.length(last) < n else None
 
-            for current_start, current_end in changed_ranges[1:]:
-                prev_start, prev_end = optimized[-1]
+        # Aligned index of the remote file, built from the bytes as they arrive
+        remote = self.new_index() if start == 0 else None
+        pending = bytearray()
 
-                # If ranges overlap or are adjacent, merge them
-                if current_start <= prev_end + 1:
-                    optimized[-1] = (prev_start, max(prev_end, current_end))
-                else:
-                    optimized.append((current_start, current_end))
+        def index_remote(data: bytes, final: bool = False) -> None:
+            pending.extend(data)
+            while len(pending) >= n or (final and pending):
+                block = bytes(pending[:n])
+                del pending[:n]
+                remote.append(remote.total_size, len(block), hash_digest(block), zlib.adler32(block))
+
+        buffer = bytearray()
+        base = start   # Absolute offset of buffer[0]
+        pos = 0        # Start of the sliding window in buffer
+        literal = 0    # Start of the pending literal run in buffer
+        exhausted = False
+        iterator = iter(blocks)
+
+        def fill(need: int) -> bool:
+            nonlocal exhausted
+            while not exhausted and len(buffer) - pos < need:
+                try:
+                    data = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                except Exception as e:
+                    raise DeltaInterrupted(base + literal, result) from e
+                if data:
+                    if pbar is not None:
+                        pbar.update(len(data))
+                    if remote is not None:
+                        index_remote(data)
+                    buffer.extend(data)
+            return len(buffer) - pos >= need
+
+        def flush_literal(upto: int) -> None:
+            if upto > literal:
+                offset = base + literal
+                if write_at is not None:
+                    write_at(offset, bytes(buffer[literal:upto]))
+                result.add_changed(offset, base + upto - 1)
+                result.bytes_received += upto - literal
+
+        def find_block(at: int, length: int, candidates: List[int]) -> Optional[int]:
+            """Return the local offset of the block at buffer[at:at + length], if any."""
+            if not candidates:
+                return None
+            strong = hash_digest(bytes(buffer[at:at + length]))
+            for i in candidates:
+                if existing_chunks.length(i) == length and existing_chunks.digest(i) == strong:
+                    return existing_chunks.start(i)
+            return None
+
+        def in_place(at: int) -> bool:
+            """Whether one of the next few windows after ``at`` is a local block."""
+            for k in range(1, self.ROLLING_LOOKAHEAD + 1):
+                if not fill(k * n + n):
+                    return False
+                window = at + k * n
+                if find_block(window, n, existing_chunks.find_weak(zlib.adler32(buffer[window:window + n]))) is not None:
+                    return True
+            return False
+
+        def take_match(length: int, local_start: int) -> None:
+            offset = base + pos
+            if local_start != offset:
+                # Reuse data from the local copy at its new position
+                if write_at is not None:
+                    write_at(offset, bytes(buffer[pos:pos + length]))
+                result.bytes_relocated += length
+            result.bytes_received += length
+
+        def finish() -> DeltaResult:
+            if remote is not None:
+                index_remote(b'', final=True)
+            result.index = remote
+            return result
+
+        weak_values = set(existing_chunks.weak)
+        weak = None
+        sliding = 0    # Byte steps left in the current slide
+        stride = 0     # Bytes to step over window by window before sliding again
+        backoff = 0    # Stride after the next slide that finds nothing
+        while len(buffer) - pos >= n or fill(n):
+            if weak is None:
+                weak = zlib.adler32(buffer[pos:pos + n])
+
+            local_start = find_block(pos, n, existing_chunks.find_weak(weak))
+            if local_start is not None:
+                flush_literal(pos)
+                take_match(n, local_start)
+                weak = None
+                sliding = stride = backoff = 0
+                # Drop processed data so the buffer stays small
+                del buffer[:pos + n]
+                base += pos + n
+                pos = literal = 0
+                continue
+
+            if not sliding:
+                if stride:
+                    stride = max(stride - n, 0)
+                elif not in_place(pos):
+                    # Data was inserted or removed, or is new: look for the
+                    # offset where local blocks resume
+                    sliding = n
+
+            if sliding:
+                if len(buffer) - pos <= n and not fill(n + 1):
+                    break
+                # Slide the window byte by byte until a weak checksum matches
+                a = weak & 0xffff
+                b = weak >> 16
+                stop = min(pos + sliding, len(buffer) - n)
+                moved = pos
+                while pos < stop:
+                    out_byte = buffer[pos]
+                    a = (a - out_byte + buffer[pos + n]) % mod
+                    b = (b - n * out_byte + a - 1) % mod
+                    pos += 1
+                    if (b << 16) | a in weak_values:
+                        break
+                weak = (b << 16) | a
+                sliding -= pos - moved
+                if not sliding:
+                    # Nothing found: slide once more (an insertion shorter than
+                    # a window resumes within two), then step over new data
+                    stride = backoff
+                    backoff = max(2 * backoff, n)
+            else:
+                pos += n
+                weak = None
+
+            if pos - literal >= 4 * n:
+                flush_literal(pos)
+                del buffer[:pos]
+                base += pos
+                pos = literal = 0
 
-            return optimized
+        # Fewer than chunk_size bytes are left after the window: the only
+        # possible match is the (shorter) last block of the local file
+        end = len(buffer)
+        if tail is not None:
+            tail_len = existing_chunks.length(tail)
+            if end - tail_len >= literal and find_block(end - tail_len, tail_len, [tail]) is not None:
+                flush_literal(end - tail_len)
+                pos = end - tail_len
+                take_match(tail_len, existing_chunks.start(tail))
+                return finish()
+
+        flush_literal(end)
+        return finish()
+
+    def find_changed_chunks(
+        self,
+        response: Any,
+        existing_chunks: ChunkIndex,
+        max_gap: int = 0,
+        max_bytes: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        """
+        Compare a remote file to local chunks and identify ranges that need downloading.
+
+        The response body is consumed; nothing is written. Use stream_delta to
+        apply the changes in the same pass instead of fetching them again.
+
+        Args:
+            response: The file download response
+            existing_chunks: ChunkIndex of the local copy from get_file_chunks
+            max_gap: Join ranges separated by at most this many bytes
+            max_bytes: Largest size of one returned range
+
+        Returns:
+            List of coalesced (start, end) byte ranges that need downloading
+        """
+        if not existing_chunks:
+            total_size = int(response.headers.get('content-length', 0))
+            if total_size > 0:
+                return coalesce_ranges([(0, total_size - 1)], max_gap, max_bytes)
+            return []
 
-        return []
+        result = self.stream_delta(
+            response.iter_content(chunk_size=self.chunk_size),
+            existing_chunks,
+            None
+        )
+        return coalesce_ranges(result.changed_ranges, max_gap, max_bytes)
@@ -0,0 +1,290 @@
+import hashlib
+from typing import Any, Iterable, Iterator, List, Optional
+
+
+_SIZE_SUFFIXES = {'': 1, 'B': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(value: Any, allow_zero: bool = False) -> int:
+    """Parse a byte size such as ``1048576``, ``512K`` or ``4M``.
+
+    Args:
+        value: Size with an optional K/M/G suffix (powers of 1024)
+        allow_zero: Accept 0 (for thresholds that can be disabled)
+
+    Returns:
+        Size in bytes
+    """
+    text = str(value).strip().upper().rstrip('B') or '0'
+    suffix = text[-1] if text[-1] in _SIZE_SUFFIXES else ''
+    number = text[:-1] if suffix else text
+    try:
+        size = int(number) * _SIZE_SUFFIXES[suffix]
+    except ValueError:
+        raise ValueError(f"Invalid size: {value}")
+    if size < 0 or (size == 0 and not allow_zero):
+        raise ValueError(f"Size must be positive: {value}")
+    return size
+
+
+class FixedChunking:
+    """Splits data into fixed-size chunks aligned to absolute file offsets."""
+
+    name = 'fixed'
+
+    def __init__(self, chunk_size: int = 1024 * 1024):
+        """Initialize the strategy.
+
+        Args:
+            chunk_size: Size of each chunk in bytes
+        """
+        self.chunk_size = chunk_size
+
+    def split(self, blocks: Iterable[bytes], start: int = 0) -> Iterator[bytes]:
+        """Re-slice a stream of arbitrary blocks into chunks.
+
+        Args:
+            blocks: Iterable of data pieces of any size
+            start: Absolute offset of the first byte in ``blocks``
+
+        Yields:
+            Consecutive chunks of the stream
+        """
+        buffer = bytearray()
+        position = start
+        boundary = (start // self.chunk_size + 1) * self.chunk_size
+
+        for data in blocks:
+            if not data:
+                continue
+            if not buffer and len(data) == boundary - position:
+                # Already exactly one chunk (e.g. received into a pooled buffer): no copy
+                yield data
+                position = boundary
+                boundary += self.chunk_size
+                continue
+            buffer += data
+            while len(buffer) >= boundary - position:
+                take = boundary - position
+                yield bytes(buffer[:take])
+                del buffer[:take]
+                position = boundary
+                boundary += self.chunk_size
+
+        if buffer:
+            yield bytes(buffer)
+
+    def describe(self) -> str:
+        """Return the spec string for this strategy."""
+        return f"fixed:{self.chunk_size}"
+
+
+def _gear_table() -> List[int]:
+    """Deterministic table of 256 pseudo-random 64-bit values.
+
+    The table is derived from SHA-256 so chunk boundaries are identical on
+    every host and across runs, which keeps cached chunk lists comparable.
+    """
+    return [
+        int.from_bytes(hashlib.sha256(b'ifetch-gear' + bytes([i])).digest()[:8], 'big')
+        for i in range(256)
+    ]
+
+
+class FastCDCChunking:
+    """Content-defined chunking using a Gear rolling hash (FastCDC).
+
+    Cut points depend only on the bytes preceding them, so an edit moves at
+    most the boundaries next to it and later chunks keep their hashes even
+    if their offsets shift. Normalized chunking uses a stricter mask before
+    the average size and a looser one after it to narrow the size spread.
+
+    The cut-point search is a per-byte Python loop (a few MB/s), so the
+    strategy is meant for offline analysis of local data; downloads refuse
+    it rather than becoming CPU-bound.
+    """
+
+    name = 'cdc'
+
+    GEAR = _gear_table()
+    _MASK64 = (1 << 64) - 1
+
+    def __init__(self, min_size: int = 256 * 1024, avg_size: int = 1024 * 1024, max_size: int = 4 * 1024 * 1024):
+        """Initialize the strategy.
+
+        Args:
+            min_size: Smallest chunk size in bytes (except the final chunk)
+            avg_size: Target average chunk size in bytes (rounded to a power of two)
+            max_size: Largest chunk size in bytes
+        """
+        if not 0 < min_size <= avg_size <= max_size:
+            raise ValueError("CDC sizes must satisfy 0 < min <= avg <= max")
+
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+
+        bits = max(avg_size.bit_length() - 1, 1)
+        # Use the high bits: they depend on the last 64 bytes of input
+        self._mask_strict = ((1 << (bits + 1)) - 1) << (63 - bits)
+        self._mask_loose = ((1 << (bits - 1)) - 1) << (65 - bits)
+
+    @property
+    def chunk_size(self) -> int:
+        """Average chunk size, used where a nominal size is needed."""
+        return self.avg_size
+
+    def _cut_point(self, data: bytearray) -> int:
+        """Return the length of the next chunk at the start of ``data``."""
+        length = len(data)
+        if length <= self.min_size:
+            return length
+
+        limit = min(length, self.max_size)
+        normal = min(self.avg_size, limit)
+        gear = self.GEAR
+        mask64 = self._MASK64
+        h = 0
+
+        mask = self._mask_strict
+        for i in range(self.min_size, normal):
+            h = ((h << 1) + gear[data[i]]) & mask64
+            if not h & mask:
+                return i + 1
+
+        mask = self._mask_loose
+        for i in range(normal, limit):
+            h = ((h << 1) + gear[data[i]]) & mask64
+            if not h & mask:
+                return i + 1
+
+        return limit
+
+    def split(self, blocks: Iterable[bytes], start: int = 0) -> Iterator[bytes]:
+        """Split a stream of arbitrary blocks at content-defined boundaries.
+
+        Args:
+            blocks: Iterable of data pieces of any size
+            start: Absolute offset of the first byte (unused; boundaries
+                depend on content only)
+
+        Yields:
+            Consecutive chunks of the stream
+        """
+        buffer = bytearray()
+
+        for data in blocks:
+            if not data:
+                continue
+            buffer += data
+            while len(buffer) >= self.max_size:
+                cut = self._cut_point(buffer)
+                yield bytes(buffer[:cut])
+                del buffer[:cut]
+
+        while buffer:
+            cut = self._cut_point(buffer)
+            yield bytes(buffer[:cut])
+            del buffer[:cut]
+
+    def describe(self) -> str:
+        """Return the spec string for this strategy."""
+        return f"cdc:{self.min_size}:{self.avg_size}:{self.max_size}"
+
+
+class AdaptiveChunking:
+    """Chooses a fixed chunk size per file from the file's size.
+
+    Small files get small chunks and huge files get large ones, so every
+    file has a bounded number of chunks. The size is a power of two
+    between ``min_size`` and ``max_size``. A size used earlier for the same
+    file is kept while it stays within a factor of four of the ideal one,
+    so files that grow or shrink a little keep comparable chunk indexes.
+    """
+
+    name = 'auto'
+
+    def __init__(
+        self,
+        min_size: int = 64 * 1024,
+        max_size: int = 64 * 1024 * 1024,
+        target_chunks: int = 1024
+    ):
+        """Initialize the policy.
+
+        Args:
+            min_size: Smallest chunk size in bytes
+            max_size: Largest chunk size in bytes
+            target_chunks: Number of chunks to aim for per file
+        """
+        if not 0 < min_size <= max_size:
+            raise ValueError("Adaptive sizes must satisfy 0 < min <= max")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_chunks = target_chunks
+
+    @property
+    def chunk_size(self) -> int:
+        """Smallest chunk size, used where a nominal size is needed."""
+        return self.min_size
+
+    def size_for(self, file_size: int, previous: Optional[int] = None) -> int:
+        """Return the chunk size to use for a file.
+
+        Args:
+            file_size: Size of the file in bytes
+            previous: Chunk size used for this file before, if known
+        """
+        wanted = max(file_size // self.target_chunks, 1)
+        ideal = 1 << (wanted - 1).bit_length()
+        ideal = min(max(ideal, self.min_size), self.max_size)
+        if previous and self.min_size <= previous <= self.max_size and ideal // 4 <= previous <= ideal * 4:
+            return previous
+        return ideal
+
+    def describe(self) -> str:
+        """Return the spec string for this policy."""
+        return f"auto:{self.min_size}:{self.max_size}"
+
+
+def parse_chunk_spec(spec: str):
+    """Build a chunking strategy from a ``--chunk-size`` value.
+
+    Accepted forms:
+        ``1048576`` / ``1M`` / ``fixed:1M``  fixed-size chunks
+        ``cdc``                              FastCDC with 256K/1M/4M
+        ``cdc:AVG``                          FastCDC with AVG/4, AVG, AVG*4
+        ``cdc:MIN:AVG:MAX``                  FastCDC with explicit sizes
+        ``auto`` / ``auto:MIN:MAX``          fixed size chosen per file
+
+    Args:
+        spec: Strategy specification
+
+    Returns:
+        A FixedChunking, FastCDCChunking or AdaptiveChunking instance
+    """
+    name, _, params = str(spec).partition(':')
+    name = name.strip().lower()
+
+    if name == 'cdc':
+        sizes = [parse_size(p) for p in params.split(':')] if params else []
+        if not sizes:
+            return FastCDCChunking()
+        if len(sizes) == 1:
+            return FastCDCChunking(sizes[0] // 4, sizes[0], sizes[0] * 4)
+        if len(sizes) == 3:
+            return FastCDCChunking(*sizes)
+        raise ValueError(f"Invalid CDC chunk spec: {spec}")
+
+    if name == 'auto':
+        sizes = [parse_size(p) for p in params.split(':')] if params else []
+        if not sizes:
+            return AdaptiveChunking()
+        if len(sizes) == 2:
+            return AdaptiveChunking(*sizes)
+        raise ValueError(f"Invalid adaptive chunk spec: {spec}")
+
+    if name == 'fixed':
+        return FixedChunking(parse_size(params) if params else 1024 * 1024)
+
+    return FixedChunking(parse_size(spec))
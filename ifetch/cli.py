@@ -2,6 +2,7 @@
 import sys
 import argparse
 from downloader import DownloadManager
+from hashing import available_algorithms
 
 def main():
     parser = argparse.ArgumentParser(
@@ -35,9 +36,128 @@ def main():
     )
     parser.add_argument(
         '--chunk-size',
+        default='auto',
+        help='Chunking for differential downloads: "auto" or "auto:MIN:MAX" picks a fixed size per file '
+             '(default), a size such as 1M or "fixed:SIZE" uses one size for all files (sizes accept K/M/G)'
+    )
+    parser.add_argument(
+        '--hash',
+        dest='hash_algorithm',
+        help='Hash algorithm for chunk digests and file checksums '
+             f'({", ".join(available_algorithms())}; default: md5 chunks, sha256 checksums)'
+    )
+    parser.add_argument(
+        '--hash-workers',
+        type=int,
+        help='Threads used to hash large local files, shared by all downloads (default: CPU count)'
+    )
+    parser.add_argument(
+        '--rolling-checksum',
+        action='store_true',
+        help='Match local chunks at any offset (rsync-style) so inserted data does not shift every later chunk'
+    )
+    parser.add_argument(
+        '--chunk-store',
+        action='store_true',
+        help='Index chunks across the destination tree and rebuild renamed or moved files from local data'
+    )
+    parser.add_argument(
+        '--retry-budget',
+        type=float,
+        default=0.2,
+        help='Retries allowed per request sent, across the whole job (default: 0.2, 0 for no budget)'
+    )
+    parser.add_argument(
+        '--breaker-threshold',
+        type=int,
+        default=5,
+        help='Consecutive failures that pause all requests to a host (default: 5, 0 to disable)'
+    )
+    parser.add_argument(
+        '--stall-rate',
+        help='Abort and retry transfers slower than this rate, e.g. 64K (default: off)'
+    )
+    parser.add_argument(
+        '--stall-time',
+        type=float,
+        default=10.0,
+        help='Seconds a transfer may stay below --stall-rate (default: 10)'
+    )
+    parser.add_argument(
+        '--hedge',
+        action='store_true',
+        help="Send a duplicate request for a large file's lagging last segment"
+    )
+    parser.add_argument(
+        '--coalesce-gap',
+        default='1M',
+        help='Fetch gaps up to this size between needed ranges to save requests; '
+             'about round-trip time x bandwidth (default: 1M, 0 to disable)'
+    )
+    parser.add_argument(
+        '--max-request-size',
+        default='64M',
+        help='Largest byte range fetched by one request (default: 64M)'
+    )
+    parser.add_argument(
+        '--multi-range',
+        type=int,
+        default=32,
+        help='Most ranges batched into one multi-range request; servers that refuse are '
+             'detected and fall back to single ranges (default: 32, 0 to disable)'
+    )
+    parser.add_argument(
+        '--segment-size',
+        default='64M',
+        help='Fetch files larger than two segments as parallel ranges of this size, sharing '
+             'the --max-workers budget (default: 64M, 0 to disable)'
+    )
+    parser.add_argument(
+        '--engine',
+        choices=['threads', 'asyncio'],
+        default='threads',
+        help='Transfer engine: thread pool, or asyncio with aiohttp for many small files (default: threads)'
+    )
+    parser.add_argument(
+        '--async-connections',
         type=int,
-        default=1024*1024,
-        help='Chunk size in bytes for differential downloads (default: 1MB)'
+        default=100,
+        help='Files downloaded at once by the asyncio engine (default: 100)'
+    )
+    parser.add_argument(
+        '--transport',
+        choices=['requests', 'httpx', 'http2', 'curl'],
+        default='requests',
+        help='HTTP client for range requests; http2 is httpx with HTTP/2 multiplexing (default: requests)'
+    )
+    parser.add_argument(
+        '--adaptive-workers',
+        action='store_true',
+        help='Adjust the number of transfers in flight between 1 and --max-workers based on '
+             'throughput, errors and latency (AIMD)'
+    )
+    parser.add_argument(
+        '--limit-rate',
+        help='Cap total download bandwidth shared by all workers, in bytes per second (e.g. 500K, 2M)'
+    )
+    parser.add_argument(
+        '--limit-schedule',
+        help='Time-of-day limits overriding --limit-rate, e.g. "09:00-18:00=1M,18:00-09:00=off"'
+    )
+    parser.add_argument(
+        '--merkle',
+        action='store_true',
+        help='Report the Merkle root over chunk digests as each file checksum instead of re-reading the file'
+    )
+    parser.add_argument(
+        '--verify',
+        action='store_true',
+        help='Check local files against their Merkle trees and re-download only damaged chunks'
+    )
+    parser.add_argument(
+        '--paranoid',
+        action='store_true',
+        help='Ignore the local hash cache and re-hash every existing file'
     )
     parser.add_argument(
         '--log-file',
@@ -66,7 +186,29 @@ def main():
             email=args.email,
             max_workers=args.max_workers,
             max_retries=args.max_retries,
-            chunk_size=args.chunk_size
+            chunk_size=args.chunk_size,
+            rolling_checksum=args.rolling_checksum,
+            paranoid=args.paranoid,
+            hash_algorithm=args.hash_algorithm,
+            hash_workers=args.hash_workers,
+            chunk_store=args.chunk_store,
+            merkle=args.merkle,
+            coalesce_gap=args.coalesce_gap,
+            max_request_size=args.max_request_size,
+            segment_size=args.segment_size,
+            multi_range=args.multi_range,
+            retry_budget=args.retry_budget,
+            breaker_threshold=args.breaker_threshold,
+            stall_rate=args.stall_rate,
+            stall_time=args.stall_time,
+            hedge=args.hedge,
+            engine=args.engine,
+            async_connections=args.async_connections,
+            transport=args.transport,
+            limit_rate=args.limit_rate,
+            limit_schedule=args.limit_schedule,
+            adaptive_workers=args.adaptive_workers,
+            verify=args.verify
         )
 
         # Authenticate (will prompt for password if needed)
@@ -95,6 +237,7 @@ def main():
             print(f"- Successfully downloaded: {summary['successful']}")
             print(f"- Failed: {summary['failed']}")
             print(f"- Total data transferred: {summary['total_bytes_transferred'] / (1024*1024):.2f} MB")
+            print(f"- Data changed locally: {summary['total_bytes_changed'] / (1024*1024):.2f} MB")
             print(f"- Changed chunks: {summary['total_changed_chunks']}")
             print(f"\nDetailed report saved to '{args.local_path}/download_report.json'")
 
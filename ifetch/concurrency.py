@@ -0,0 +1,172 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on the number of transfers in flight.
+
+    Every ``interval`` seconds the controller compares the aggregate
+    throughput with the previous window. While the limit is in use and
+    throughput keeps improving, the limit grows by one (additive increase).
+    Throttling answers (429/503), timeouts or a latency spike cut it in half
+    (multiplicative decrease). Every change is logged as a structured event.
+    """
+
+    def __init__(
+        self,
+        maximum: int,
+        bytes_read: Callable[[], int],
+        logger: logging.Logger,
+        minimum: int = 1,
+        initial: Optional[int] = None,
+        interval: float = 2.0,
+        gain: float = 0.05,
+        latency_factor: float = 2.0
+    ):
+        """Initialize the controller.
+
+        Args:
+            maximum: Upper bound for the limit (the worker count)
+            bytes_read: Returns the total bytes received so far
+            logger: Receives ``concurrency_adjusted`` events
+            minimum: Lower bound for the limit
+            initial: Starting limit (default: half of ``maximum``)
+            interval: Seconds per measurement window
+            gain: Relative throughput improvement needed to keep growing
+            latency_factor: Window latency, relative to the best window seen,
+                treated as a spike
+        """
+        self.minimum = max(minimum, 1)
+        self.maximum = max(maximum, self.minimum)
+        self.limit = min(max(initial or self.maximum // 2, self.minimum), self.maximum)
+        self.bytes_read = bytes_read
+        self.logger = logger
+        self.interval = interval
+        self.gain = gain
+        self.latency_factor = latency_factor
+
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self._peak = 0
+        self._window_start = time.monotonic()
+        self._window_bytes = bytes_read()
+        self._previous_rate: Optional[float] = None
+        self._errors = 0
+        self._latency_sum = 0.0
+        self._latency_count = 0
+        self._best_latency: Optional[float] = None
+        self.adjustments = 0
+
+    def acquire(self) -> None:
+        """Wait until another transfer may start."""
+        with self._cond:
+            self._maybe_adjust()
+            while self.in_flight >= self.limit:
+                self._cond.wait(timeout=self.interval)
+                self._maybe_adjust()
+            self.in_flight += 1
+            self._peak = max(self._peak, self.in_flight)
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now."""
+        with self._cond:
+            self._maybe_adjust()
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            self._peak = max(self._peak, self.in_flight)
+            return True
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._maybe_adjust()
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold a transfer slot for the duration of a block."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def record_error(self) -> None:
+        """Count a throttling answer or timeout in the current window."""
+        with self._cond:
+            self._errors += 1
+            self._maybe_adjust()
+
+    def record_latency(self, seconds: float) -> None:
+        """Record the time a request took to start returning its body."""
+        with self._cond:
+            self._latency_sum += seconds
+            self._latency_count += 1
+
+    def _maybe_adjust(self) -> None:
+        """Close the current window when it is due and apply the AIMD rule.
+
+        Must be called with the condition held.
+        """
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        # Errors end a window early so the cut is immediate
+        if elapsed < self.interval and not (self._errors and elapsed >= self.interval / 4):
+            return
+
+        total = self.bytes_read()
+        rate = (total - self._window_bytes) / elapsed
+        latency = self._latency_sum / self._latency_count if self._latency_count else None
+        saturated = self._peak >= self.limit
+        old = self.limit
+        reason = None
+
+        if self._errors:
+            self.limit = max(self.minimum, old // 2)
+            reason = "errors"
+        elif latency is not None and self._best_latency and latency > self._best_latency * self.latency_factor:
+            self.limit = max(self.minimum, old // 2)
+            reason = "latency"
+        elif saturated and (self._previous_rate is None or rate > self._previous_rate * (1 + self.gain)):
+            self.limit = min(self.maximum, old + 1)
+            reason = "throughput"
+
+        if latency is not None:
+            self._best_latency = latency if self._best_latency is None else min(self._best_latency, latency)
+        if self.limit != old:
+            self.adjustments += 1
+            self.logger.info(json.dumps({
+                "event": "concurrency_adjusted",
+                "reason": reason,
+                "from": old,
+                "to": self.limit,
+                "throughput": round(rate),
+                "errors": self._errors,
+                "latency": round(latency, 3) if latency is not None else None
+            }))
+            if self.limit > old:
+                self._cond.notify(self.limit - old)
+
+        # A cut resets the baseline so the next windows can grow again
+        self._previous_rate = None if reason in ("errors", "latency") else rate
+        self._window_start = now
+        self._window_bytes = total
+        self._errors = 0
+        self._latency_sum = 0.0
+        self._latency_count = 0
+        self._peak = self.in_flight
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "adaptive": True,
+                "limit": self.limit,
+                "minimum": self.minimum,
+                "maximum": self.maximum,
+                "adjustments": self.adjustments,
+            }
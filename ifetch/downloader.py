@@ -1,13 +1,12 @@
 import os
 import time
-import shutil
 import json
 import threading
 import sys  # Added import
+import statistics
 from pathlib import Path
-from typing import Optional, List, Set, Dict, Any, Union
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import requests
+from typing import Optional, List, Set, Dict, Any, Union, Callable, Tuple, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from tqdm import tqdm
 from pyicloud import PyiCloudService
 from pyicloud.exceptions import (
@@ -15,10 +14,43 @@ from pyicloud.exceptions import (
     PyiCloudNoStoredPasswordAvailableException
 )
 from logger import setup_logging
-from models import DownloadStatus
-from chunker import FileChunker
+from models import DownloadStatus, DeltaResult, RangeTask
+from chunker import FileChunker, DeltaInterrupted
+from chunk_index import ChunkIndex
 from tracker import DownloadTracker
-from utils import can_read_file
+from utils import can_read_file, content_signature, remote_identity
+from writer import TempFileWriter, PositionalFile
+from hash_cache import HashCache
+from chunk_store import ChunkStore
+from hashing import get_algorithm
+from fileio import iter_file_blocks
+from merkle import MerkleTree
+from ranges import coalesce_ranges
+from transport import get_transport, TransportError, TransportResponse
+from async_engine import AsyncEngine
+from chunking import parse_size
+from ratelimit import RateLimiter, parse_rate, parse_schedule
+from concurrency import AdaptiveConcurrency
+from multirange import MultiRangeFetcher
+from retry import RetryPolicy, CircuitBreaker, classify, retry_after, AUTH_EXPIRED, FATAL
+from scheduler import DelayedQueue
+from url_resolver import URLResolver, resolve_download_url
+from stall import StallMonitor, Transfer
+from bufferpool import BufferPool, read_chunks
+
+# A tail segment is hedged when a fresh request would finish this many times sooner
+HEDGE_MARGIN = 1.5
+
+
+def _limit_stream(blocks: Iterable[bytes], limit: int) -> Iterator[bytes]:
+    """Yield pieces of a body until ``limit`` bytes have been produced."""
+    remaining = limit
+    for data in blocks:
+        if len(data) >= remaining:
+            yield data[:remaining]
+            return
+        remaining -= len(data)
+        yield data
 
 
 class DownloadManager:
@@ -28,8 +60,34 @@ class DownloadManager:
         email: Optional[str] = None,
         max_workers: int = 4,
         max_retries: int = 3,
-        chunk_size: int = 1024 * 1024
+        chunk_size: Union[int, str] = 'auto',
+        rolling_checksum: bool = False,
+        paranoid: bool = False,
+        hash_algorithm: Optional[str] = None,
+        hash_workers: Optional[int] = None,
+        chunk_store: bool = False,
+        merkle: bool = False,
+        verify: bool = False,
+        coalesce_gap: Union[int, str] = 1024 * 1024,
+        max_request_size: Union[int, str] = 64 * 1024 * 1024,
+        segment_size: Union[int, str] = 64 * 1024 * 1024,
+        engine: str = 'threads',
+        async_connections: int = 100,
+        transport: str = 'requests',
+        limit_rate: Union[int, str, None] = None,
+        limit_schedule: Optional[str] = None,
+        adaptive_workers: bool = False,
+        multi_range: int = 32,
+        retry_budget: float = 0.2,
+        breaker_threshold: int = 5,
+        stall_rate: Union[int, str, None] = None,
+        stall_time: float = 10.0,
+        hedge: bool = False
     ):
+        if engine not in ('threads', 'asyncio'):
+            raise ValueError(f"Unknown engine '{engine}'. Available: threads, asyncio")
+        if engine == 'asyncio':
+            AsyncEngine.require()  # Fail before signing in, not when the download starts
         self.email = email or os.environ.get('ICLOUD_EMAIL')
         if not self.email:
             raise ValueError(
@@ -37,13 +95,81 @@ class DownloadManager:
             )
 
         self.max_workers = max_workers
+        self.engine = engine
+        self.async_connections = async_connections
         self.max_retries = max_retries
         self.api: Optional[PyiCloudService] = None
         self.logger = setup_logging()
         self.download_results: List[DownloadStatus] = []
         self._active_downloads: Set[str] = set()
         self._download_lock = threading.Lock()
-        self.chunker = FileChunker(chunk_size)
+        self._file_errors: Dict[str, BaseException] = {}  # Last failure per path, for deferral
+        # Jittered retries with a job-wide budget and a per-host circuit breaker
+        self.retry = RetryPolicy(
+            max_retries=max_retries,
+            budget=retry_budget,
+            breaker=CircuitBreaker(breaker_threshold, logger=self.logger)
+        )
+        # HTTP backend with keep-alive connections shared by every range request,
+        # sized for one connection per file worker plus one per segment slot
+        self.http = get_transport(transport, max_per_host=2 * max_workers)
+        # Signed download URLs, resolved ahead of the workers and renewed before they expire
+        self.urls = URLResolver(resolve_download_url, self.logger, lookahead=2 * max_workers)
+        # One hashing pool for all files so parallel downloads share the cores
+        self.hash_pool = ThreadPoolExecutor(
+            max_workers=hash_workers or os.cpu_count() or 1,
+            thread_name_prefix='hash'
+        )
+        # Without an explicit choice keep MD5 chunks and SHA-256 checksums
+        self.chunker = FileChunker.from_spec(
+            chunk_size, rolling=rolling_checksum, hash_algorithm=hash_algorithm or 'md5'
+        )
+        if self.chunker.strategy.name == 'cdc':
+            # The per-byte Gear scan runs at a few MB/s: far below network speed
+            raise ValueError(
+                "Content-defined chunking is only for offline analysis (benchmarks/bench_chunking.py); "
+                "use --rolling-checksum to reuse shifted data in downloads"
+            )
+        self.chunker.pool = self.hash_pool
+        self.checksum_hash = get_algorithm(hash_algorithm or 'sha256')
+        self.paranoid = paranoid
+        self.hash_cache: Optional[HashCache] = None
+        self.use_chunk_store = chunk_store
+        self.chunk_store: Optional[ChunkStore] = None
+        self.merkle = merkle
+        self.verify = verify
+        # Range requests: fetch small gaps rather than pay another round trip
+        self.coalesce_gap = parse_size(coalesce_gap, allow_zero=True)
+        self.max_request_size = parse_size(max_request_size)
+        # Large files are split into segments fetched on extra connections.
+        # The slots are shared by all files so one huge file cannot take
+        # more than max_workers extra connections.
+        self.segment_size = parse_size(segment_size, allow_zero=True)
+        self.segment_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='segment')
+        # Files that fail during the traversal wait here for a final pass
+        self.deferred_files = DelayedQueue()
+        # Slow connections are aborted and retried; the last segment of a file may be hedged
+        self.stalls = StallMonitor(parse_rate(stall_rate) or 0, stall_time, self.logger)
+        # Scattered ranges go out as multi-range requests where the server allows
+        self.multi_range = MultiRangeFetcher(
+            self.http, multi_range, self.max_request_size,
+            retry=self.retry, stalls=self.stalls, current_url=self.urls.current
+        )
+        self.hedge = hedge
+        self.hedges = {"sent": 0, "won": 0}
+        self._race_lock = threading.Lock()
+        # Receive buffers reused across transfers instead of one allocation per piece
+        self.buffers = BufferPool(keep=2 * max_workers)
+        self._segment_slots = threading.BoundedSemaphore(max_workers)
+        # One bandwidth budget for every worker, segment and file
+        self.limiter = RateLimiter(
+            parse_rate(limit_rate) if limit_rate is not None else None,
+            parse_schedule(limit_schedule) if limit_schedule else None
+        )
+        # Optional AIMD gate on transfers in flight, max_workers is its ceiling
+        self.concurrency: Optional[AdaptiveConcurrency] = None
+        if adaptive_workers:
+            self.concurrency = AdaptiveConcurrency(max_workers, lambda: self.limiter.bytes, self.logger)
 
     def authenticate(self) -> None:
         """Handle iCloud authentication including 2FA/2SA if needed."""
@@ -109,55 +235,755 @@ class DownloadManager:
         return item
 
     def calculate_checksum(self, file_path: Path) -> str:
-        """Calculate SHA-256 checksum of a file."""
-        import hashlib
-        sha256 = hashlib.sha256()
-        with file_path.open('rb') as f:
-            for chunk in iter(lambda: f.read(8192), b''):
-                sha256.update(chunk)
-        return sha256.hexdigest()
-
-    def _stream_download_range(self, url: str, start: int, end: int, out_file: Any, pbar: Any) -> None:
-        """Streams a specific byte range to the out_file, updating pbar."""
-        headers = {'Range': f'bytes={start}-{end}'}
-        retries = 0
-        last_error = None
-        stream_chunk_size = 1024 * 1024
-
-        while retries < self.max_retries:
-            resp = None
+        """Calculate the checksum of a file with the configured algorithm (SHA-256 by default)."""
+        checksum = self.checksum_hash.new()
+        for block in iter_file_blocks(file_path):
+            checksum.update(block)
+        return checksum.hexdigest()
+
+    def _file_chunker(self, local_path: Path, file_size: int) -> FileChunker:
+        """Chunker for one file, keeping the chunk size cached for it when still suitable."""
+        previous = self.hash_cache.get_chunking(local_path) if self.hash_cache is not None else None
+        return self.chunker.for_size(file_size, previous)
+
+    def _local_chunks(self, local_path: Path, chunker: Optional[FileChunker] = None) -> ChunkIndex:
+        """Chunk index of the local copy, served from the hash cache when unchanged."""
+        chunker = chunker or self.chunker
+        if self.hash_cache is None or not local_path.exists():
+            return chunker.get_file_chunks(local_path)
+
+        chunking = chunker.describe()
+        index = self.hash_cache.get_chunks(local_path, chunking)
+        if index is None:
+            st = local_path.stat()
+            index = chunker.get_file_chunks(local_path)
+            self.hash_cache.put(local_path, st, chunking=chunking, index=index)
+        return index
+
+    def _local_checksum(
+        self,
+        local_path: Path,
+        index: Optional[ChunkIndex] = None,
+        chunker: Optional[FileChunker] = None
+    ) -> str:
+        """Checksum of the local file, served from the hash cache when unchanged.
+
+        Args:
+            local_path: File to checksum
+            index: Chunk index of the file's current content to cache alongside
+            chunker: Chunker ``index`` was built with (default: the global one)
+        """
+        if self.hash_cache is None:
+            return self.calculate_checksum(local_path)
+
+        checksum = self.hash_cache.get_checksum(local_path, self.checksum_hash.name)
+        if checksum is None:
+            index = self._cacheable(index, chunker or self.chunker)
+            st = local_path.stat()
+            checksum = self.calculate_checksum(local_path)
+            self.hash_cache.put(
+                local_path, st,
+                chunking=(chunker or self.chunker).describe() if index is not None else None,
+                index=index,
+                checksum_algorithm=self.checksum_hash.name,
+                checksum=checksum
+            )
+        return checksum
+
+    @staticmethod
+    def _cacheable(index: Optional[ChunkIndex], chunker: FileChunker) -> Optional[ChunkIndex]:
+        """Return ``index`` if it can be cached under the chunker's label, else None.
+
+        Indexes rebuilt from the chunk store or a Merkle tree carry no weak
+        checksums; cached under a rolling label they would quietly turn off
+        rolling matching, so the file is re-hashed when next needed instead.
+        """
+        if index is not None and chunker.rolling and index.weak is None:
+            return None
+        return index
+
+    @property
+    def checksum_name(self) -> str:
+        """Name of the per-file checksum reported in results.
+
+        A Merkle root is labelled with both algorithms: inner nodes use the
+        checksum hash, leaves are the chunk digests (``merkle-sha256/md5``).
+        """
+        if self.merkle:
+            return f"merkle-{self.checksum_hash.name}/{self.chunker.hash.name}"
+        return self.checksum_hash.name
+
+    def _file_checksum(
+        self,
+        local_path: Path,
+        index: Optional[ChunkIndex] = None,
+        chunker: Optional[FileChunker] = None
+    ) -> str:
+        """Checksum reported for a completed file.
+
+        With ``merkle`` this is the root of the tree over the chunk digests,
+        which needs no extra read when the chunk index is known.
+        """
+        if not self.merkle:
+            return self._local_checksum(local_path, index, chunker)
+        if index is None:
+            chunker = chunker or self._file_chunker(local_path, local_path.stat().st_size)
+            index = self._local_chunks(local_path, chunker)
+        return MerkleTree.from_index(index, self.checksum_hash).root.hex()
+
+    def _record_download(
+        self,
+        local_path: Path,
+        item: Any,
+        index: Optional[ChunkIndex] = None,
+        chunker: Optional[FileChunker] = None
+    ) -> None:
+        """Remember which remote version a completed file holds.
+
+        The chunk index and iCloud identity go to the hash cache, so the
+        file can be skipped next run if neither side changed, together with
+        the file's Merkle tree for later verification. They also go to the
+        chunk store if one is open.
+        """
+        chunker = chunker or self.chunker
+        if index is None:
+            index = self._local_chunks(local_path, chunker)
+        remote = remote_identity(item)
+        if self.hash_cache is not None:
+            if remote is not None:
+                self.hash_cache.put(
+                    local_path, local_path.stat(), chunking=chunker.describe(),
+                    index=self._cacheable(index, chunker), remote=remote
+                )
+            root = MerkleTree.from_index(index, self.checksum_hash).root.hex()
+            self.hash_cache.put_tree(
+                local_path, chunker.describe(), self.checksum_hash.name, root, index, remote
+            )
+        if self.chunk_store is not None:
+            self.chunk_store.add_file(local_path, chunker.describe(), index, remote, content_signature(item))
+
+    def _skip_unchanged(self, item: Any, local_path: Path) -> bool:
+        """Complete a file without opening it if its last download is still current.
+
+        Both the iCloud identity (document, etag, size, modification date)
+        and the local file's stat must match what was recorded.
+        """
+        remote = remote_identity(item)
+        if self.hash_cache is None or remote is None:
+            return False
+        if self.hash_cache.get_remote(local_path) != remote:
+            return False
+
+        self.logger.info(json.dumps({
+            "event": "remote_unchanged",
+            "file": item.name,
+            "path": str(local_path)
+        }))
+        self.download_results.append(DownloadStatus(
+            path=str(local_path),
+            size=local_path.stat().st_size,
+            downloaded=0,
+            checksum=self._file_checksum(local_path),
+            checksum_algorithm=self.checksum_name,
+            status="completed",
+            changes=0
+        ))
+        return True
+
+    def _read_stored_chunk(self, digest: bytes, chunking: str) -> Optional[bytes]:
+        """Read a chunk from any local file known to hold it, verifying its digest."""
+        for path, offset, length in self.chunk_store.locate(digest, chunking):
             try:
-                resp = requests.get(url, headers=headers, stream=True, timeout=60)
-                resp.raise_for_status()
-                if resp.status_code in (200, 206):
-                    out_file.seek(start)
-                    for data_chunk in resp.iter_content(chunk_size=stream_chunk_size):
-                        if data_chunk:
-                            out_file.write(data_chunk)
-                            pbar.update(len(data_chunk))
-                    return
+                with path.open('rb') as f:
+                    f.seek(offset)
+                    data = f.read(length)
+            except OSError:
+                continue
+            if len(data) == length and self.chunker.hash.digest(data) == digest:
+                return data
+        return None
+
+    def _copy_from_store(self, item: Any, local_path: Path) -> bool:
+        """Assemble a renamed or moved remote file from chunks already in the mirror.
+
+        The remote content is recognized by its iCloud identity or, for
+        copies and re-exports, by the content signature that comes with its
+        download URL, so its chunk list is known before anything is
+        downloaded. Each chunk is copied from
+        whichever local file holds it; only chunks found nowhere are fetched
+        with range requests.
+
+        Returns:
+            True if the file was written, False to fall back to a normal download
+        """
+        remote = remote_identity(item)
+        if self.chunk_store is None or remote is None:
+            return False
+
+        source = self.chunk_store.find_renamed(remote, local_path)
+        if source is None:
+            try:
+                # The URL is needed for the transfer anyway and brings the signature
+                self._resolve_url(item)
+            except Exception:
+                return False  # The transfer resolves it again and reports the error
+            source = self.chunk_store.find_renamed(remote, local_path, content_signature(item))
+        if source is None:
+            return False
+        chunker = self._file_chunker(source, remote['size'] or 0)
+        chunking = chunker.describe()
+        manifest = self.chunk_store.manifest(source, chunking)
+        if manifest is None or manifest.total_size != remote['size']:
+            return False
+
+        temp_path = local_path.with_suffix(local_path.suffix + '.temp')
+        writer = TempFileWriter(local_path, temp_path, manifest.total_size)
+        missing = []
+        reused = 0
+        downloaded = 0
+        try:
+            writer.prepare()
+            for i in range(len(manifest)):
+                data = self._read_stored_chunk(manifest.digest(i), chunking)
+                if data is None:
+                    missing.append(i)
+                    continue
+                writer.write_at(manifest.start(i), data)
+                reused += len(data)
+
+            if missing:
+                url = self._resolve_url(item)
+                downloaded = self._download_ranges(url, manifest.ranges(missing), writer.write_at, chunker)
+                expected = sum(manifest.length(i) for i in missing)
+                if downloaded < expected:
+                    raise Exception(f"Downloaded {downloaded} of {expected} missing bytes")
+
+            writer.finish()
+            if missing:
+                # Fetched chunks must match the manifest, or the copy would be
+                # recorded (and later skipped as unchanged) with bad content
+                with temp_path.open('rb') as f:
+                    for i in missing:
+                        f.seek(manifest.start(i))
+                        if chunker.hash.digest(f.read(manifest.length(i))) != manifest.digest(i):
+                            raise Exception(f"Downloaded chunk at {manifest.start(i)} does not match the manifest")
+            temp_path.replace(local_path)
+        except Exception as e:
+            writer.close()
+            if temp_path.exists():
+                temp_path.unlink()
+            self.logger.warning(json.dumps({
+                "event": "chunk_store_copy_failed",
+                "file": item.name,
+                "source": str(source),
+                "error": str(e)
+            }))
+            return False
+
+        self.logger.info(json.dumps({
+            "event": "copied_from_chunk_store",
+            "file": item.name,
+            "source": str(source),
+            "bytes_reused": reused,
+            "bytes_downloaded": downloaded
+        }))
+        checksum = self._file_checksum(local_path, manifest, chunker)
+        self._record_download(local_path, item, manifest, chunker)
+        self.download_results.append(DownloadStatus(
+            path=str(local_path),
+            size=manifest.total_size,
+            downloaded=downloaded,
+            bytes_changed=downloaded,
+            reused=reused,
+            checksum=checksum,
+            checksum_algorithm=self.checksum_name,
+            status="completed",
+            changes=len(missing)
+        ))
+        return True
+
+    def _verify_and_repair(self, item: Any, local_path: Path) -> bool:
+        """Check a local file against its Merkle tree and re-fetch only damaged chunks.
+
+        The file is re-hashed and its tree compared top-down with the one
+        recorded at download time. Differing chunks are downloaded by range,
+        written in place and verified again; the rest is not touched.
+
+        Returns:
+            True if the file is intact or was repaired, False to fall back to
+            a normal download (no usable tree, remote changed, or
+            content-defined chunks that cannot be compared by position)
+
+        Raises:
+            Exception: If the damaged chunks could not be fetched or are
+                still damaged after the repair
+        """
+        stored = self.hash_cache.get_tree(local_path) if self.hash_cache is not None else None
+        remote = remote_identity(item)
+        if stored is None or remote is None:
+            return False
+        chunking, algorithm, _, expected_index, stored_remote = stored
+        chunker = self._file_chunker(local_path, expected_index.total_size)
+        if (
+            stored_remote != remote or algorithm != self.checksum_hash.name
+            or chunking != chunker.describe() or chunker.strategy.name != 'fixed'
+        ):
+            return False
+
+        total_size = expected_index.total_size
+        if local_path.stat().st_size != total_size:
+            # Interrupted or truncated writes: the tree pinpoints the damage
+            with local_path.open('r+b') as f:
+                f.truncate(total_size)
+
+        expected = MerkleTree.from_index(expected_index, self.checksum_hash)
+        actual = MerkleTree.from_index(chunker.get_file_chunks(local_path), self.checksum_hash)
+        damaged = expected.diff(actual)
+        ranges = expected_index.ranges(damaged)
+        downloaded = 0
+
+        if damaged:
+            self.logger.warning(json.dumps({
+                "event": "verify_damaged",
+                "file": item.name,
+                "path": str(local_path),
+                "chunks": len(damaged),
+                "ranges": ranges
+            }))
+            url = self._resolve_url(item)
+            with local_path.open('r+b') as f:
+                downloaded = self._download_ranges(url, ranges, PositionalFile(f).write_at, chunker)
+
+                for i in damaged:
+                    f.seek(expected_index.start(i))
+                    if chunker.hash.digest(f.read(expected_index.length(i))) != expected_index.digest(i):
+                        raise Exception(f"Chunk at {expected_index.start(i)} still damaged after repair")
+
+        self.logger.info(json.dumps({
+            "event": "verify_repaired" if damaged else "verify_ok",
+            "file": item.name,
+            "path": str(local_path),
+            "bytes_downloaded": downloaded
+        }))
+        self._record_download(local_path, item, expected_index, chunker)
+        self.download_results.append(DownloadStatus(
+            path=str(local_path),
+            size=total_size,
+            downloaded=downloaded,
+            bytes_changed=downloaded,
+            checksum=self._file_checksum(local_path, expected_index, chunker),
+            checksum_algorithm=self.checksum_name,
+            status="completed",
+            changes=len(ranges)
+        ))
+        return True
+
+    def _request_ranges(self, ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Turn needed byte ranges into range requests, trading gap bytes for round trips."""
+        return coalesce_ranges(ranges, self.coalesce_gap, self.max_request_size)
+
+    def _download_ranges(
+        self,
+        url: str,
+        ranges: List[Tuple[int, int]],
+        write_at: Callable[[int, bytes], None],
+        chunker: FileChunker
+    ) -> int:
+        """Fetch scattered byte ranges and write them in place.
+
+        Ranges are coalesced, then batched into multi-range requests; any
+        range the server did not deliver that way is fetched on its own.
+
+        Returns:
+            Bytes downloaded
+        """
+        requests = self._request_ranges(ranges)
+        downloaded, leftover = self.multi_range.fetch(url, requests, write_at, self.limiter.throttle)
+        for start, end in leftover:
+            downloaded += self._stream_download_range(
+                url, start, end, write_at, None, chunker=chunker
+            ).bytes_received
+        return downloaded
+
+    def _resolve_url(self, item: Any) -> str:
+        """Return the content URL of a file without reading its body."""
+        return self.urls.get(item)
+
+    def _open_body(self, item: Any) -> Tuple[Any, Optional[str]]:
+        """Open the whole remote body of a file for streaming.
+
+        Bodies the async engine already holds, and empty files, come from the
+        item itself. Otherwise the signed URL comes from the resolver; failed
+        requests are retried under the same policy as range requests, renewing
+        the URL when the content server rejects it.
+
+        Returns:
+            The open response and the URL to use for range requests
+        """
+        if getattr(item, 'prefetched', False) or not getattr(item, 'size', None):
+            response = item.open(stream=True)
+            return response, response.url
+        url = self.urls.get(item)
+        task = RangeTask(0, item.size - 1, DeltaResult())
+        while True:
+            url = self.urls.current(url)
+            with self.retry.attempt(url) as attempt:
+                try:
+                    response = self.http.get(url, timeout=60)
+                except TransportError as e:
+                    attempt.failure(e)
+                    error = e
                 else:
-                    last_error = requests.RequestException(f"Unexpected status code {resp.status_code} for range request")
+                    attempt.success()
+                    return response, url
+            time.sleep(self._retry_delay(url, task, error))
+
+    def _stream_download_range(
+        self,
+        url: str,
+        start: int,
+        end: int,
+        write_at: Callable[[int, bytes], None],
+        pbar: Any,
+        existing_chunks: Optional[ChunkIndex] = None,
+        chunker: Optional[FileChunker] = None
+    ) -> DeltaResult:
+        """Streams a specific byte range through the delta engine, updating pbar.
+
+        Only chunks that differ from ``existing_chunks`` are written. After a
+        broken stream the next attempt resumes from the first unprocessed byte.
+        """
+        chunker = chunker or self.chunker
+        result = DeltaResult()
+        result.index = chunker.new_index(origin=start)
+        task = RangeTask(start, end, result)
 
-            except requests.RequestException as e:
-                last_error = e
+        while True:
+            error = self._range_attempt(url, task, write_at, pbar, existing_chunks, chunker)
+            if error is None:
+                return result
+            # Nothing else to do for this range: wait here
+            time.sleep(self._retry_delay(url, task, error))
+
+    def _range_attempt(
+        self,
+        url: str,
+        task: RangeTask,
+        write_at: Callable[[int, bytes], None],
+        pbar: Any,
+        existing_chunks: Optional[ChunkIndex],
+        chunker: FileChunker
+    ) -> Optional[BaseException]:
+        """Make one request for the rest of a range, folding progress into the task.
+
+        Returns:
+            None when the range is complete, otherwise the error to retry on
+        """
+        resp = None
+        url = self.urls.current(url)
+        # Leaving the block without an outcome (lost race, unexpected error)
+        # records a neutral one, so a probe of the host is always released
+        with self.retry.attempt(url) as attempt:
+            try:
+                requested = time.monotonic()
+                resp = self.http.get(url, task.start, task.end, timeout=60)
+                if self.concurrency:
+                    self.concurrency.record_latency(time.monotonic() - requested)
+                if resp.status != 206 and not (resp.status == 200 and task.start == 0):
+                    raise TransportError(f"Unexpected status code {resp.status} for range request")
+                transfer, body = self._body(resp, url, chunker, task.start)
+                task.transfer = transfer
+                if task.lost:
+                    return None  # A hedged duplicate already finished the range
+                result = chunker.stream_delta(
+                    body,
+                    existing_chunks if existing_chunks is not None else chunker.new_index(),
+                    write_at,
+                    pbar,
+                    start=task.start
+                )
+                received = task.start + result.bytes_received
+                if received <= task.end:
+                    # A body cut short without a transport error: the partial
+                    # tail chunk cannot be trusted, so fetch the range again
+                    raise TransportError(
+                        f"Range ended at byte {received}, expected {task.end + 1}"
+                    )
+                # The host delivered the range, whichever copy of it is kept
+                attempt.success()
+                self._settle(task, result, complete=True)
+                return None
+            except DeltaInterrupted as e:
+                error = e.__cause__ or e
+                if not task.lost:  # Not aborted because a hedged rival won
+                    attempt.failure(error)
+                if self._settle(task, e.result, complete=False):
+                    task.start = e.position
+                return error
+            except TransportError as e:
+                if not task.lost:
+                    attempt.failure(e)
+                self._settle(task, None, complete=False)
+                return e
             finally:
+                task.transfer = None
                 if resp:
                     resp.close()
 
-            retries += 1
-            self.logger.warning(
-                f"Retrying download for range {start}-{end} (size {end-start+1} bytes), "
-                f"attempt {retries}/{self.max_retries}. Error: {last_error}"
-            )
-            time.sleep(2 ** retries)
+    def _body(
+        self,
+        response: TransportResponse,
+        url: str,
+        chunker: FileChunker,
+        start: int
+    ) -> Tuple[Transfer, Iterator[Any]]:
+        """Read a response body as paced pieces, watched for stalls.
 
-        raise Exception(
-            f"Failed to download range {start}-{end} after {self.max_retries} retries: {last_error}"
-        )
+        With fixed-size chunks the body is received straight into a pooled
+        buffer in chunk-aligned pieces, which the chunker hashes and writes
+        without copying them.
+
+        Returns:
+            The stall monitor's Transfer (for aborting it) and the body
+        """
+        transfer = self.stalls.watch(response, url)
+        read_size = self.stalls.read_size(chunker.chunk_size)
+        if chunker.rolling or chunker.strategy.name != 'fixed':
+            return transfer, self.limiter.throttle(transfer.iter(response.iter_content(chunk_size=read_size)))
+
+        def pieces() -> Iterator[memoryview]:
+            try:
+                yield from read_chunks(
+                    transfer.readinto(response.readinto), self.buffers, chunker.chunk_size, start, read_size
+                )
+            finally:
+                transfer.close()
+        return transfer, self.limiter.throttle(pieces())
+
+    def _settle(self, task: RangeTask, result: Optional[DeltaResult], complete: bool) -> bool:
+        """Fold an attempt's result into its task, deciding hedged races.
+
+        The first copy of a hedged range to complete wins and aborts the
+        other. A copy that fails while its rival is still running drops out
+        and leaves the range to the rival.
+
+        Returns:
+            False if the result was discarded
+        """
+        with self._race_lock:
+            if task.lost:
+                return False
+            rival = task.rival
+            if rival is not None and not rival.lost:
+                if not complete:
+                    task.lost = True
+                    return False
+                rival.lost = True
+            else:
+                rival = None
+            if result is not None:
+                task.result.merge(result)
+        transfer = rival.transfer if rival is not None else None
+        if transfer is not None:
+            transfer.abort("Hedged duplicate finished first")
+        return True
+
+    def _retry_delay(self, url: str, task: RangeTask, error: BaseException) -> float:
+        """Count a failed attempt and return the delay before the next one.
+
+        Raises:
+            Exception: If the error is not retryable or retries are used up
+        """
+        if classify(error) == AUTH_EXPIRED and task.refreshes < 2 and self.urls.refresh(url):
+            # The signed URL expired mid-transfer: renew it and retry at once
+            task.refreshes += 1
+            return 0.0
+        task.attempts += 1
+        if self.concurrency and (
+            not isinstance(error, TransportError) or error.status is None or error.status in (429, 503)
+        ):
+            # Throttling, timeouts or broken streams: fewer transfers in flight
+            self.concurrency.record_error()
+        delay = self.retry.on_failure(url, error, task.attempts, task.delay)
+        if delay is None:
+            raise Exception(
+                f"Failed to download range {task.start}-{task.end} after {task.attempts} attempt(s) "
+                f"({classify(error)}): {error}"
+            ) from error
+        task.delay = delay
+        self.logger.warning(json.dumps({
+            "event": "range_retry",
+            "range": [task.start, task.end],
+            "attempt": task.attempts,
+            "max_retries": self.max_retries,
+            "delay": round(delay, 2),
+            "error": str(error)
+        }))
+        return delay
+
+    def _segments(self, total_size: int, chunker: FileChunker) -> List[Tuple[int, int]]:
+        """Split a large file into chunk-aligned segments to fetch in parallel.
+
+        Returns:
+            Inclusive (start, end) segments, or an empty list when the file
+            should be streamed over a single connection
+        """
+        if (
+            not self.segment_size or self.max_workers < 2 or chunker.rolling
+            or chunker.strategy.name != 'fixed' or total_size < 2 * self.segment_size
+        ):
+            return []
+        size = max(self.segment_size // chunker.chunk_size, 1) * chunker.chunk_size
+        return [(start, min(start + size, total_size) - 1) for start in range(0, total_size, size)]
+
+    def _fetch_segments(
+        self,
+        url: str,
+        segments: List[Tuple[int, int]],
+        write_at: Callable[[int, bytes], None],
+        pbar: Any,
+        existing_chunks: ChunkIndex,
+        chunker: FileChunker
+    ) -> DeltaResult:
+        """Fetch consecutive segments concurrently through the delta engine.
+
+        A segment runs on the shared segment pool when a slot is free and on
+        the calling thread otherwise, so a huge file uses idle capacity
+        without starving other downloads. A failed segment goes back on a
+        delayed queue until its retry is due, and the calling thread keeps
+        fetching other segments instead of sleeping on it; it only sleeps
+        when nothing but retries that are not due yet is left. With ``hedge``,
+        a last segment that lags far behind the others gets a duplicate
+        request; whichever copy completes first is kept.
+        """
+        def attempt(task: RangeTask) -> Optional[BaseException]:
+            try:
+                # The progress bar follows the original request of a hedged range
+                return self._range_attempt(
+                    url, task, write_at, None if task in hedges else pbar, existing_chunks, chunker
+                )
+            finally:
+                self._segment_slots.release()
+                if self.concurrency:
+                    self.concurrency.release()
+
+        def free_slot() -> bool:
+            if not self._segment_slots.acquire(blocking=False):
+                return False
+            if self.concurrency and not self.concurrency.try_acquire():
+                self._segment_slots.release()
+                return False
+            return True
+
+        def finished(task: RangeTask, error: Optional[BaseException]) -> None:
+            if task.lost:
+                return  # Superseded by its hedged rival
+            if error is not None:
+                queue.push(task, self._retry_delay(url, task, error))
+            elif task in hedges:
+                with self._race_lock:
+                    self.hedges["won"] += 1
+
+        def hedge_delay(future: Any, tail: RangeTask) -> Optional[float]:
+            """Launch a duplicate of a lagging last segment.
+
+            Returns:
+                Seconds until the tail should be checked again, or None
+                once it is hedged
+            """
+            submitted, start = started[future]
+            elapsed = time.monotonic() - submitted
+            # How long a fresh request for the range would take at this file's pace
+            expected = statistics.median(pace) * (tail.end - tail.start + 1)
+            transfer = tail.transfer
+            received = transfer.bytes if transfer is not None else 0
+            remaining = tail.end - start + 1 - received
+            eta = remaining * elapsed / received if received else float('inf')
+            if elapsed < expected / 2 or eta <= HEDGE_MARGIN * expected:
+                return 0.5
+            if not free_slot():
+                return 0.5
+            twin = RangeTask(tail.start, tail.end, DeltaResult())
+            twin.result.index = chunker.new_index(origin=tail.start)
+            with self._race_lock:
+                tail.rival, twin.rival = twin, tail
+                self.hedges["sent"] += 1
+            hedges.add(twin)
+            tasks.insert(tasks.index(tail) + 1, twin)
+            launch(twin)
+            self.logger.info(json.dumps({
+                "event": "range_hedged",
+                "range": [tail.start, tail.end],
+                "elapsed": round(elapsed, 2),
+                "expected": round(expected, 2)
+            }))
+            return None
+
+        def launch(task: RangeTask) -> None:
+            future = self.segment_pool.submit(attempt, task)
+            pending[future] = task
+            started[future] = (time.monotonic(), task.start)
+
+        queue = DelayedQueue()
+        tasks = []
+        for start, end in segments:
+            result = DeltaResult()
+            result.index = chunker.new_index(origin=start)
+            tasks.append(RangeTask(start, end, result))
+            queue.push(tasks[-1])
+
+        pending: Dict[Any, RangeTask] = {}
+        started: Dict[Any, Tuple[float, int]] = {}  # Future -> (submit time, first byte)
+        pace: List[float] = []  # Seconds per byte of completed requests
+        hedges: Set[RangeTask] = set()
+        try:
+            while queue or pending:
+                task = queue.pop_ready()
+                if task is not None:
+                    if free_slot():
+                        launch(task)
+                    else:
+                        finished(task, self._range_attempt(
+                            url, task, write_at, pbar, existing_chunks, chunker
+                        ))
+                    continue
+                if not pending:
+                    # Only retries left and none is due yet
+                    time.sleep(queue.next_delay())
+                    continue
+                timeout = queue.next_delay()
+                if self.hedge and not hedges and not queue and len(pending) == 1 and pace:
+                    # Everything else is done: consider a duplicate of the straggler
+                    timeout = hedge_delay(*next(iter(pending.items())))
+                    if timeout is None:
+                        continue
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = pending.pop(future)
+                    submitted, start = started.pop(future)
+                    error = future.result()
+                    if error is None and not task.lost:
+                        pace.append((time.monotonic() - submitted) / (task.end - start + 1))
+                    finished(task, error)
+        finally:
+            # Never leave segments writing after this returns or raises
+            wait(pending)
+
+        combined = DeltaResult()
+        combined.index = chunker.new_index(origin=segments[0][0])
+        for task in tasks:
+            combined.merge(task.result)
+        return combined
 
     def download_drive_item(self, item: Any, local_path: Path) -> bool:
-        """Download file with differential updates support and checkpointing."""
+        """Download file with differential updates support and checkpointing.
+
+        Files whose iCloud identity and local copy both match the previous
+        run are not opened at all. Otherwise the remote body is read once:
+        each chunk is compared with the local copy as it arrives and only
+        mismatched chunks are written to the temporary file. If the stream
+        breaks, the rest of the file is fetched with range requests.
+        """
         if not hasattr(item, 'name') or not hasattr(item, 'open'):
             self.logger.warning(json.dumps({
                 "event": "invalid_item",
@@ -165,100 +991,184 @@ class DownloadManager:
             }))
             return False
 
+        try:
+            if self._complete_without_download(item, local_path):
+                return True
+            if self.concurrency is None:
+                return self._transfer(item, local_path)
+            with self.concurrency.slot():
+                return self._transfer(item, local_path)
+        finally:
+            self.urls.discard(item)
+
+    def _complete_without_download(self, item: Any, local_path: Path) -> bool:
+        """Finish a file from local data alone when possible.
+
+        Covers Merkle verification (``verify``), remote files unchanged since
+        the last run and renamed files rebuilt from the chunk store.
+
+        Returns:
+            True if the file needs no full transfer
+        """
+        if local_path.exists():
+            if self.verify:
+                try:
+                    if self._verify_and_repair(item, local_path):
+                        return True
+                except Exception as e:
+                    self.logger.warning(json.dumps({
+                        "event": "verify_repair_failed",
+                        "file": item.name,
+                        "path": str(local_path),
+                        "error": str(e)
+                    }))
+                    # The cached hashes describe content the file no longer
+                    # has: drop them so the full download compares real data
+                    self.hash_cache.forget(local_path)
+                    return False
+            return self._skip_unchanged(item, local_path)
+        return self._copy_from_store(item, local_path)
+
+    def _transfer(self, item: Any, local_path: Path) -> bool:
+        """Stream the remote body through the delta engine into the local file."""
         tracker = DownloadTracker(local_path)
         temp_path: Optional[Path] = None
+        writer: Optional[TempFileWriter] = None
         total_size = 0
         final_checksum = ""
 
         try:
-            with item.open(stream=True) as response:
-                total_size = int(response.headers.get('content-length', 0))
-                existing_chunks = self.chunker.get_file_chunks(local_path)
-                changed_ranges = self.chunker.find_changed_chunks(response, existing_chunks)
-
-                if not changed_ranges:
-                    self.logger.info(json.dumps({
-                        "event": "file_unchanged",
-                        "file": item.name,
-                        "path": str(local_path)
-                    }))
-                    if local_path.exists() and local_path.stat().st_size > 0:
-                        final_checksum = self.calculate_checksum(local_path)
-
-                    self.download_results.append(DownloadStatus(
-                        path=str(local_path),
-                        size=total_size,
-                        downloaded=0,
-                        checksum=final_checksum,
-                        status="completed",
-                        changes=0
-                    ))
-                    tracker.cleanup()
-                    return True
-
-                bytes_to_download = sum(end - start + 1 for start, end in changed_ranges)
+            response, url = self._open_body(item)
+            with response:
+                # Without a Content-Length the size iCloud lists still catches a short stream
+                total_size = int(response.headers.get('content-length', 0)) or getattr(item, 'size', 0) or 0
+                chunker = self._file_chunker(local_path, total_size)
+                existing_chunks = self._local_chunks(local_path, chunker)
                 temp_path = local_path.with_suffix(local_path.suffix + '.temp')
-
-                local_path.parent.mkdir(parents=True, exist_ok=True)
-
-                if local_path.exists():
-                    shutil.copy2(local_path, temp_path)
+                writer = TempFileWriter(local_path, temp_path, total_size)
+                segments = self._segments(total_size, chunker)
+                head_end = segments[0][1] if segments else total_size - 1
+                if isinstance(response, TransportResponse):
+                    _, body = self._body(response, url, chunker, 0)
                 else:
-                    with temp_path.open('wb') as f:
-                        if total_size > 0:
-                            f.seek(total_size - 1)
-                            f.write(b'\0')
+                    # Buffered by the async engine (already paced) or an empty file
+                    body = response.iter_content(chunk_size=chunker.chunk_size)
+                if segments:
+                    body = _limit_stream(body, head_end + 1)
 
-                with temp_path.open('r+b') as out_file, tqdm(
+                with tqdm(
                     desc=f"Updating {item.name}",
-                    total=bytes_to_download,
+                    total=total_size,
                     unit='B',
                     unit_scale=True,
                     unit_divisor=1024,
                     disable=not sys.stdout.isatty()
                 ) as pbar:
-                    changed_ranges.sort(key=lambda r: r[0])
-
-                    for start, end in changed_ranges:
-                        self._stream_download_range(response.url, start, end, out_file, pbar)
-                        tracker.save_status(end + 1)
+                    try:
+                        delta = chunker.stream_delta(body, existing_chunks, writer.write_at, pbar)
+                    except DeltaInterrupted as e:
+                        self.logger.warning(json.dumps({
+                            "event": "stream_interrupted",
+                            "file": item.name,
+                            "position": e.position,
+                            "error": str(e.__cause__ or e)
+                        }))
+                        delta = e.result
+                        tracker.save_status(e.position)
+                        if e.position <= head_end:
+                            delta.merge(self._stream_download_range(
+                                url, e.position, head_end,
+                                writer.write_at, pbar, existing_chunks, chunker
+                            ))
 
-                if not temp_path.exists() or (total_size > 0 and temp_path.stat().st_size == 0):
-                    self.logger.error(json.dumps({
-                        "event": "invalid_temp_file_after_download",
-                        "file": item.name,
-                        "path": str(temp_path),
-                        "error": "Temporary file is empty or doesn't exist when it shouldn't be."
-                    }))
-                    return False
+                    if segments:
+                        # The first segment came from the open response;
+                        # release it and fetch the others in parallel
+                        response.close()
+                        delta.merge(self._fetch_segments(
+                            url, segments[1:], writer.write_at, pbar, existing_chunks, chunker
+                        ))
 
-                temp_path.replace(local_path)
+            if not total_size:
+                # No size known at all: trust what the stream delivered
+                total_size = writer.total_size = delta.bytes_received
+            if delta.bytes_received < total_size:
+                raise Exception(
+                    f"Remote stream ended early: {delta.bytes_received} of {total_size} bytes"
+                )
 
+            local_size = local_path.stat().st_size if local_path.exists() else -1
+            if not delta.has_changes and local_size == total_size:
+                self.logger.info(json.dumps({
+                    "event": "file_unchanged",
+                    "file": item.name,
+                    "path": str(local_path)
+                }))
                 if local_path.exists() and local_path.stat().st_size > 0:
-                    final_checksum = self.calculate_checksum(local_path)
-                elif total_size == 0 and local_path.exists() and local_path.stat().st_size == 0:
-                    final_checksum = self.calculate_checksum(local_path)
-                else:
-                    self.logger.error(json.dumps({
-                        "event": "final_file_issue_after_replace",
-                        "file": item.name,
-                        "path": str(local_path),
-                        "error": "Final file is missing or empty unexpectedly after replace."
-                    }))
-                    return False
+                    final_checksum = self._file_checksum(local_path, existing_chunks, chunker)
+                self._record_download(local_path, item, existing_chunks, chunker)
 
                 self.download_results.append(DownloadStatus(
                     path=str(local_path),
                     size=total_size,
-                    downloaded=bytes_to_download,
+                    downloaded=delta.bytes_received,
                     checksum=final_checksum,
+                    checksum_algorithm=self.checksum_name,
                     status="completed",
-                    changes=len(changed_ranges)
+                    changes=0
                 ))
                 tracker.cleanup()
                 return True
 
+            # Size changes without content changes still need a truncated copy
+            writer.prepare()
+            writer.finish()
+            tracker.save_status(total_size)
+
+            if not temp_path.exists() or (total_size > 0 and temp_path.stat().st_size == 0):
+                self.logger.error(json.dumps({
+                    "event": "invalid_temp_file_after_download",
+                    "file": item.name,
+                    "path": str(temp_path),
+                    "error": "Temporary file is empty or doesn't exist when it shouldn't be."
+                }))
+                return False
+
+            temp_path.replace(local_path)
+
+            if local_path.exists() and local_path.stat().st_size > 0:
+                final_checksum = self._file_checksum(local_path, delta.index, chunker)
+            elif total_size == 0 and local_path.exists() and local_path.stat().st_size == 0:
+                final_checksum = self._file_checksum(local_path, delta.index, chunker)
+            else:
+                self.logger.error(json.dumps({
+                    "event": "final_file_issue_after_replace",
+                    "file": item.name,
+                    "path": str(local_path),
+                    "error": "Final file is missing or empty unexpectedly after replace."
+                }))
+                return False
+
+            self._record_download(local_path, item, delta.index, chunker)
+            self.download_results.append(DownloadStatus(
+                path=str(local_path),
+                size=total_size,
+                # The whole body was streamed; only the differing bytes were written
+                downloaded=delta.bytes_received,
+                bytes_changed=delta.bytes_changed,
+                checksum=final_checksum,
+                checksum_algorithm=self.checksum_name,
+                status="completed",
+                changes=len(delta.changed_ranges)
+            ))
+            tracker.cleanup()
+            return True
+
         except Exception as e:
+            if writer:
+                writer.close()
+            with self._download_lock:
+                self._file_errors[str(local_path)] = e
             self.logger.error(json.dumps({
                 "event": "download_failed",
                 "file": getattr(item, 'name', 'unknown'),
@@ -286,8 +1196,12 @@ class DownloadManager:
             ))
             return False
 
-    def process_item_parallel(self, item: Any, local_path: Path) -> None:
-        """Process files and directories in parallel."""
+    def process_item_parallel(self, item: Any, local_path: Path, defer: bool = True) -> None:
+        """Process files and directories in parallel.
+
+        Failed files are queued for the final retry pass unless ``defer`` is
+        False.
+        """
         try:
             if can_read_file(item):
                 with self._download_lock:
@@ -303,6 +1217,8 @@ class DownloadManager:
                             "file": getattr(item, 'name', 'unknown'),
                             "path": str(local_path)
                         }))
+                    elif defer:
+                        self._defer_file(item, local_path)
                     else:
                         self.logger.error(json.dumps({
                             "event": "download_failed",
@@ -317,10 +1233,12 @@ class DownloadManager:
                 contents = item.dir()
                 if contents:
                     local_path.mkdir(parents=True, exist_ok=True)
+                    children = [(item[name], local_path / name) for name in contents]
+                    self._enqueue_urls(children)
                     with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
                         futures = [
-                            executor.submit(self.process_item_parallel, item[name], local_path / name)
-                            for name in contents
+                            executor.submit(self.process_item_parallel, child, child_path)
+                            for child, child_path in children
                         ]
                         for future in as_completed(futures):
                             try:
@@ -338,6 +1256,81 @@ class DownloadManager:
                 "error": str(e)
             }))
 
+    def _enqueue_urls(self, children: Iterable[Tuple[Any, Path]]) -> None:
+        """Start resolving download URLs for files a folder is about to transfer.
+
+        Files with a local copy are left out: most of them turn out unchanged.
+        """
+        for child, child_path in children:
+            if can_read_file(child) and not child_path.exists():
+                self.urls.enqueue(child)
+
+    def _defer_file(self, item: Any, local_path: Path) -> None:
+        """Queue a failed file for the final retry pass, unless its failure was fatal.
+
+        The delay is the Retry-After of the last failure when the server sent
+        one, otherwise a jittered backoff. Fatal failures (404, local disk
+        errors) would fail again and are reported at once.
+        """
+        with self._download_lock:
+            error = self._file_errors.pop(str(local_path), None)
+        if error is not None and classify(error) == FATAL:
+            self.logger.error(json.dumps({
+                "event": "download_failed",
+                "file": getattr(item, 'name', 'unknown'),
+                "path": str(local_path),
+                "error": str(error)
+            }))
+            return
+        requested = retry_after(error) if error is not None else None
+        if requested is not None:
+            delay = min(requested, self.retry.max_retry_after)
+        else:
+            delay = self.retry.backoff()
+        self.deferred_files.push((item, local_path), delay)
+        self.logger.warning(json.dumps({
+            "event": "download_deferred",
+            "file": getattr(item, 'name', 'unknown'),
+            "path": str(local_path),
+            "retry_in": round(delay, 2)
+        }))
+
+    def _forget_result(self, local_path: Path) -> None:
+        """Drop the failed result of a file that is about to be retried."""
+        path = str(local_path)
+        with self._download_lock:
+            self._file_errors.pop(path, None)
+            # Delete in place: other workers may be appending meanwhile
+            for i in reversed(range(len(self.download_results))):
+                if self.download_results[i].path == path and self.download_results[i].status == "failed":
+                    del self.download_results[i]
+
+    def _retry_deferred(self) -> None:
+        """Give every file that failed during the traversal one more attempt.
+
+        Only this thread waits for retries to become due; due files run on a
+        worker pool. Files that fail again are reported as failed.
+        """
+        if not self.deferred_files:
+            return
+        self.logger.info(json.dumps({"event": "final_retry_pass", "files": len(self.deferred_files)}))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while self.deferred_files:
+                entry = self.deferred_files.pop_ready()
+                if entry is None:
+                    time.sleep(self.deferred_files.next_delay())
+                    continue
+                item, local_path = entry
+                self._forget_result(local_path)
+                executor.submit(self.process_item_parallel, item, local_path, False)
+
+    def close(self) -> None:
+        """Stop URL prefetching and release worker pools and HTTP connections."""
+        self.urls.close()
+        self.segment_pool.shutdown(wait=True)
+        self.hash_pool.shutdown(wait=True)
+        self.http.close()
+
     def list_contents(self, path: str) -> None:
         """List contents of a directory in iCloud Drive."""
         try:
@@ -366,7 +1359,9 @@ class DownloadManager:
         successful = sum(1 for r in self.download_results if r.status == "completed")
         failed = sum(1 for r in self.download_results if r.status == "failed")
         total_bytes = sum(r.downloaded for r in self.download_results)
+        total_changed = sum(getattr(r, 'bytes_changed', 0) for r in self.download_results)
         total_changes = sum(getattr(r, 'changes', 0) for r in self.download_results)
+        total_reused = sum(getattr(r, 'reused', 0) for r in self.download_results)
 
         return {
             "summary": {
@@ -374,7 +1369,22 @@ class DownloadManager:
                 "successful": successful,
                 "failed": failed,
                 "total_bytes_transferred": total_bytes,
+                "total_bytes_changed": total_changed,
                 "total_changed_chunks": total_changes,
+                "total_bytes_reused": total_reused,
+                "http": self.http.stats(),
+                "multi_range": self.multi_range.stats(),
+                "retries": self.retry.stats(),
+                "buffers": self.buffers.stats(),
+                "stragglers": {**self.stalls.stats(), "hedged": self.hedges["sent"], "hedges_won": self.hedges["won"]},
+                "urls": self.urls.stats(),
+                "bandwidth": self.limiter.stats(),
+                "concurrency": (
+                    self.concurrency.stats() if self.concurrency
+                    else {"adaptive": False, "limit": self.max_workers}
+                ),
+                "chunk_hash": self.chunker.hash.name,
+                "checksum_algorithm": self.checksum_name,
                 "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
             },
             "details": [r.__dict__ for r in self.download_results]
@@ -386,7 +1396,11 @@ class DownloadManager:
         local_path: Union[str, Path] = '.',
         log_file: Optional[str] = None
     ) -> None:
-        """Main download method with parallel processing and logging."""
+        """Main download method with parallel processing and logging.
+
+        Connections and worker pools are released when it returns, so a
+        manager runs a single download.
+        """
         if log_file:
             self.logger = setup_logging(log_file)
 
@@ -404,10 +1418,31 @@ class DownloadManager:
             "icloud_path": icloud_path,
             "local_path": str(local_path_obj),
             "max_workers": self.max_workers,
-            "chunk_size": self.chunker.chunk_size
+            "engine": self.engine,
+            # The chunk size itself is chosen per file under the auto policy
+            "chunking": self.chunker.describe(),
+            "chunk_hash": self.chunker.hash.name,
+            "checksum_algorithm": self.checksum_name
         }))
 
-        self.process_item_parallel(item, local_path_obj)
+        cache_root = local_path_obj.parent if can_read_file(item) else local_path_obj
+        cache_root.mkdir(parents=True, exist_ok=True)
+        self.hash_cache = HashCache(cache_root, paranoid=self.paranoid)
+        if self.use_chunk_store:
+            self.chunk_store = ChunkStore(cache_root)
+        try:
+            if self.engine == 'asyncio':
+                AsyncEngine(self, max_connections=self.async_connections).run(item, local_path_obj)
+            else:
+                self.process_item_parallel(item, local_path_obj)
+            self._retry_deferred()
+        finally:
+            self.hash_cache.close()
+            self.hash_cache = None
+            if self.chunk_store is not None:
+                self.chunk_store.close()
+                self.chunk_store = None
+            self.close()
 
         report = self.generate_summary_report()
         self.logger.info(json.dumps({"event": "download_completed", "summary": report}))
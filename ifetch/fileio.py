@@ -0,0 +1,116 @@
+import mmap
+import os
+from pathlib import Path
+from typing import Iterator, Optional
+
+# Files at least this large are hashed through mmap
+MMAP_THRESHOLD = 8 * 1024 * 1024
+# Block size for the buffered path used for smaller files
+READ_BLOCK_SIZE = 1024 * 1024
+# How much hashed data accumulates before it is dropped from the page cache
+DROP_WINDOW = 64 * 1024 * 1024
+
+_PAGE = mmap.PAGESIZE
+
+
+def _fadvise(fd: int, offset: int, length: int, advice_name: str) -> None:
+    """Call posix_fadvise when the platform has it; it is only a hint."""
+    advice = getattr(os, advice_name, None)
+    if advice is None or not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        os.posix_fadvise(fd, offset, length, advice)
+    except OSError:
+        pass
+
+
+def iter_file_blocks(
+    file_path: Path,
+    block_size: int = READ_BLOCK_SIZE,
+    mmap_threshold: int = MMAP_THRESHOLD,
+    drop_cache: bool = True,
+    start: int = 0,
+    end: Optional[int] = None
+) -> Iterator[memoryview]:
+    """Yield consecutive blocks of a file for hashing without per-block allocation.
+
+    Files of at least ``mmap_threshold`` bytes are memory-mapped and yielded as
+    ``memoryview`` slices of the mapping. Smaller files are read with
+    ``readinto`` into one reusable buffer. Either way a yielded view is only
+    valid until the next one is requested; copy it if it must be kept.
+
+    The kernel is told the access is sequential. With ``drop_cache`` hashed
+    ranges are released from the page cache, so a scan of a whole mirror does
+    not evict everything else.
+
+    Args:
+        file_path: File to read
+        block_size: Size of each yielded block (the last one may be shorter)
+        mmap_threshold: Minimum file size for the mmap path
+        drop_cache: Advise the kernel to drop pages once they are hashed
+        start: Offset of the first byte to read
+        end: Offset just past the last byte to read (default: end of file)
+    """
+    with file_path.open('rb') as f:
+        fd = f.fileno()
+        file_size = os.fstat(fd).st_size
+        size = file_size if end is None else min(end, file_size)
+        if size <= start:
+            return
+        _fadvise(fd, start, size - start, 'POSIX_FADV_SEQUENTIAL')
+
+        mapped = None
+        if file_size >= mmap_threshold:
+            try:
+                mapped = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError, OverflowError):
+                mapped = None
+
+        if mapped is not None:
+            if hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mapped)
+            dropped = start - start % _PAGE
+            try:
+                for offset in range(start, size, block_size):
+                    block = view[offset:min(offset + block_size, size)]
+                    done = offset + len(block)
+                    try:
+                        yield block
+                    finally:
+                        block.release()
+
+                    if drop_cache and (done - dropped >= DROP_WINDOW or done == size):
+                        # madvise needs a page-aligned start; keep the partial page
+                        drop_end = done if done == size else done - done % _PAGE
+                        if drop_end > dropped:
+                            if hasattr(mmap, 'MADV_DONTNEED'):
+                                mapped.madvise(mmap.MADV_DONTNEED, dropped, drop_end - dropped)
+                            _fadvise(fd, dropped, drop_end - dropped, 'POSIX_FADV_DONTNEED')
+                            dropped = drop_end
+            finally:
+                view.release()
+                mapped.close()
+            return
+
+        buffer = bytearray(block_size)
+        view = memoryview(buffer)
+        offset = start
+        f.seek(start)
+        try:
+            while offset < size:
+                n = f.readinto(view[:min(block_size, size - offset)])
+                if not n:
+                    break
+                block = view[:n]
+                try:
+                    yield block
+                finally:
+                    block.release()
+                offset += n
+                if drop_cache and (offset - start) % DROP_WINDOW < n:
+                    _fadvise(fd, start, offset - start, 'POSIX_FADV_DONTNEED')
+        finally:
+            view.release()
+        if drop_cache:
+            _fadvise(fd, start, size - start, 'POSIX_FADV_DONTNEED')
@@ -0,0 +1,264 @@
+import os
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from chunk_index import ChunkIndex
+
+
+class HashCache:
+    """Persistent cache of local chunk indexes and whole-file checksums.
+
+    Entries are keyed by path and validated against the file's
+    (device, inode, size, mtime_ns), so an unchanged file costs one
+    ``stat()`` instead of a full re-read. The cache is a SQLite database
+    stored under the destination directory.
+
+    For downloaded files the entry also records the iCloud identity the
+    content came from, making the cached chunk index a manifest of that
+    remote version.
+
+    Merkle trees of downloaded files are kept in a separate table that is
+    not invalidated by local changes: they describe what the file should
+    contain, so damage can be located after the fact.
+    """
+
+    DIR_NAME = '.ifetch'
+    FILE_NAME = 'cache.sqlite'
+
+    def __init__(self, root: Path, paranoid: bool = False):
+        """Open (or create) the cache for a destination tree.
+
+        Args:
+            root: Destination directory the cache belongs to
+            paranoid: Ignore cached values and always re-hash; fresh results
+                are still written back
+        """
+        self.root = root
+        self.paranoid = paranoid
+        self.path = root / self.DIR_NAME / self.FILE_NAME
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS files ('
+                ' path TEXT PRIMARY KEY,'
+                ' dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER,'
+                ' chunking TEXT, digest_size INTEGER, total_size INTEGER,'
+                ' offsets BLOB, digests BLOB, weak BLOB,'
+                ' checksum_algorithm TEXT, checksum TEXT, remote TEXT)'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS trees ('
+                ' path TEXT PRIMARY KEY, chunking TEXT, algorithm TEXT, root TEXT,'
+                ' digest_size INTEGER, total_size INTEGER, offsets BLOB, digests BLOB, remote TEXT)'
+            )
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(files)')}
+            if 'remote' not in columns:
+                # Caches written before remote identities were recorded
+                self._conn.execute('ALTER TABLE files ADD COLUMN remote TEXT')
+            self._conn.commit()
+
+    def _key(self, file_path: Path) -> str:
+        try:
+            return str(file_path.relative_to(self.root))
+        except ValueError:
+            return str(file_path)
+
+    @staticmethod
+    def _identity(st: os.stat_result) -> tuple:
+        return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _valid_row(self, file_path: Path, columns: str) -> Optional[tuple]:
+        """Return the requested columns if the entry matches the file on disk."""
+        if self.paranoid:
+            return None
+        try:
+            st = file_path.stat()
+        except OSError:
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT dev, ino, size, mtime_ns, {columns} FROM files WHERE path = ?',
+                (self._key(file_path),)
+            ).fetchone()
+
+        if row is None or tuple(row[:4]) != self._identity(st):
+            return None
+        return row[4:]
+
+    def get_chunks(self, file_path: Path, chunking: str) -> Optional[ChunkIndex]:
+        """Return the cached chunk index if the file and chunking are unchanged."""
+        row = self._valid_row(file_path, 'chunking, digest_size, total_size, offsets, digests, weak')
+        if row is None or row[0] != chunking or row[3] is None:
+            self.misses += 1
+            return None
+        try:
+            index = ChunkIndex.from_record(row[1], row[2], row[3], row[4], row[5])
+        except ValueError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return index
+
+    def get_chunking(self, file_path: Path) -> Optional[str]:
+        """Return the chunking last used for a file, even if the file changed since."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT chunking FROM files WHERE path = ?', (self._key(file_path),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_checksum(self, file_path: Path, algorithm: str) -> Optional[str]:
+        """Return the cached whole-file checksum if the file is unchanged."""
+        row = self._valid_row(file_path, 'checksum_algorithm, checksum')
+        if row is None or row[0] != algorithm or not row[1]:
+            return None
+        return row[1]
+
+    def get_remote(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """Return the iCloud identity the file was downloaded from, if it is unchanged locally."""
+        row = self._valid_row(file_path, 'remote')
+        if row is None or not row[0]:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def put(
+        self,
+        file_path: Path,
+        st: os.stat_result,
+        chunking: Optional[str] = None,
+        index: Optional[ChunkIndex] = None,
+        checksum_algorithm: Optional[str] = None,
+        checksum: Optional[str] = None,
+        remote: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Store hashes of a file.
+
+        Args:
+            file_path: File the values describe
+            st: ``stat()`` taken before the file was hashed; nothing is stored
+                if the file changed since
+            chunking: Chunker description the index was built with
+            index: Chunk index to store (keeps the cached one when None)
+            checksum_algorithm: Name of the whole-file checksum algorithm
+            checksum: Whole-file checksum to store (keeps the cached one when None)
+            remote: iCloud identity the content was downloaded from (keeps
+                the cached one when None)
+        """
+        try:
+            if self._identity(file_path.stat()) != self._identity(st):
+                return
+        except OSError:
+            return
+
+        key = self._key(file_path)
+        identity = self._identity(st)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT dev, ino, size, mtime_ns FROM files WHERE path = ?', (key,)
+            ).fetchone()
+            if row is None or tuple(row) != identity:
+                # The file changed: stale values must not survive the update
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO files (path, dev, ino, size, mtime_ns) VALUES (?, ?, ?, ?, ?)',
+                    (key, *identity)
+                )
+            if index is not None:
+                digest_size, total_size, offsets, digests, weak = index.to_record()
+                self._conn.execute(
+                    'UPDATE files SET chunking = ?, digest_size = ?, total_size = ?,'
+                    ' offsets = ?, digests = ?, weak = ? WHERE path = ?',
+                    (chunking, digest_size, total_size, offsets, digests, weak, key)
+                )
+            if checksum is not None:
+                self._conn.execute(
+                    'UPDATE files SET checksum_algorithm = ?, checksum = ? WHERE path = ?',
+                    (checksum_algorithm, checksum, key)
+                )
+            if remote is not None:
+                self._conn.execute(
+                    'UPDATE files SET remote = ? WHERE path = ?',
+                    (json.dumps(remote, sort_keys=True), key)
+                )
+            self._conn.commit()
+
+    def get_tree(self, file_path: Path) -> Optional[Tuple[str, str, str, ChunkIndex, Optional[Dict[str, Any]]]]:
+        """Return the expected content recorded for a file by put_tree.
+
+        Returns:
+            (chunking, algorithm, root hex, chunk index, remote identity), or
+            None if nothing usable is stored
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT chunking, algorithm, root, digest_size, total_size, offsets, digests, remote'
+                ' FROM trees WHERE path = ?',
+                (self._key(file_path),)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            index = ChunkIndex.from_record(row[3], row[4], row[5], row[6])
+            remote = json.loads(row[7]) if row[7] else None
+        except ValueError:
+            return None
+        return row[0], row[1], row[2], index, remote
+
+    def put_tree(
+        self,
+        file_path: Path,
+        chunking: str,
+        algorithm: str,
+        root: str,
+        index: ChunkIndex,
+        remote: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Store the Merkle tree leaves and root of a downloaded file.
+
+        Args:
+            file_path: File the tree describes
+            chunking: Chunker description the leaves were built with
+            algorithm: Hash algorithm of the inner nodes
+            root: Hex root hash
+            index: Chunk index whose digests are the leaves
+            remote: iCloud identity of the content
+        """
+        digest_size, total_size, offsets, digests, _ = index.to_record()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO trees'
+                ' (path, chunking, algorithm, root, digest_size, total_size, offsets, digests, remote)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    self._key(file_path), chunking, algorithm, root, digest_size, total_size,
+                    offsets, digests, json.dumps(remote, sort_keys=True) if remote else None
+                )
+            )
+            self._conn.commit()
+
+    def forget(self, file_path: Path) -> None:
+        """Drop the cached hashes of a file whose content is known to differ from them.
+
+        The recorded Merkle tree is kept: it describes the expected content.
+        """
+        with self._lock:
+            self._conn.execute('DELETE FROM files WHERE path = ?', (self._key(file_path),))
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
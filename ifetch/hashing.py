@@ -0,0 +1,77 @@
+import hashlib
+from typing import Any, Callable, Dict, List
+
+try:
+    import xxhash
+except ImportError:  # Optional dependency
+    xxhash = None
+
+try:
+    import blake3 as _blake3
+except ImportError:  # Optional dependency
+    _blake3 = None
+
+
+class HashAlgorithm:
+    """A named hash backend usable for chunk digests and file checksums."""
+
+    def __init__(self, name: str, factory: Callable[[], Any], digest_size: int):
+        """Initialize the backend.
+
+        Args:
+            name: Name used on the command line, in reports and in caches
+            factory: Callable returning a new hashlib-style object
+                (``update``/``digest``/``hexdigest``)
+            digest_size: Size of the binary digest in bytes
+        """
+        self.name = name
+        self.new = factory
+        self.digest_size = digest_size
+
+    def digest(self, data: Any) -> bytes:
+        """Return the binary digest of a single buffer."""
+        h = self.new()
+        h.update(data)
+        return h.digest()
+
+
+def _builtin_algorithms() -> Dict[str, HashAlgorithm]:
+    algorithms = {
+        'md5': HashAlgorithm('md5', hashlib.md5, 16),
+        'sha1': HashAlgorithm('sha1', hashlib.sha1, 20),
+        'sha256': HashAlgorithm('sha256', hashlib.sha256, 32),
+        'blake2b': HashAlgorithm('blake2b', lambda: hashlib.blake2b(digest_size=32), 32),
+    }
+    if xxhash is not None:
+        algorithms['xxh3'] = HashAlgorithm('xxh3', xxhash.xxh3_128, 16)
+    if _blake3 is not None:
+        algorithms['blake3'] = HashAlgorithm('blake3', _blake3.blake3, 32)
+    return algorithms
+
+
+ALGORITHMS = _builtin_algorithms()
+
+# Names accepted on the command line even when the module is missing,
+# so the error can say what to install
+OPTIONAL_ALGORITHMS = {'xxh3': 'xxhash', 'blake3': 'blake3'}
+
+
+def available_algorithms() -> List[str]:
+    """Names of the hash algorithms usable on this host."""
+    return list(ALGORITHMS)
+
+
+def get_algorithm(name: str) -> HashAlgorithm:
+    """Look up a hash backend by name.
+
+    Raises:
+        ValueError: If the algorithm is unknown or its module is not installed
+    """
+    key = name.strip().lower()
+    if key in ALGORITHMS:
+        return ALGORITHMS[key]
+    if key in OPTIONAL_ALGORITHMS:
+        raise ValueError(
+            f"Hash algorithm '{key}' needs the '{OPTIONAL_ALGORITHMS[key]}' package (pip install {OPTIONAL_ALGORITHMS[key]})"
+        )
+    raise ValueError(f"Unknown hash algorithm '{name}'. Available: {', '.join(available_algorithms())}")
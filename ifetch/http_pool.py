@@ -0,0 +1,88 @@
+import threading
+from typing import Any, Callable, Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report every new connection."""
+
+    def __init__(self, on_connect: Callable[[], None], **kwargs: Any):
+        self._on_connect = on_connect
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        on_connect = self._on_connect
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                on_connect()
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                on_connect()
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool,
+        }
+
+
+class ConnectionPool:
+    """Shared keep-alive HTTP session for all transfer code.
+
+    One ``requests.Session`` serves every range request of every file and
+    worker, so connections to the content servers (and their TLS state) are
+    reused instead of being set up per request. Each host gets at most
+    ``max_per_host`` connections; further requests wait for a free one.
+    """
+
+    def __init__(self, max_per_host: int = 4, max_hosts: int = 16):
+        """Create the session.
+
+        Args:
+            max_per_host: Connections kept (and allowed) per host, normally
+                the download workers plus the segment slots
+            max_hosts: Number of per-host pools kept alive
+        """
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+
+        self.session = requests.Session()
+        adapter = _CountingAdapter(
+            self._count_connection,
+            pool_connections=max_hosts,
+            pool_maxsize=max_per_host,
+            pool_block=True
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _count_connection(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        """Send a GET request through the shared session."""
+        with self._lock:
+            self.requests += 1
+        return self.session.get(url, **kwargs)
+
+    def stats(self) -> Dict[str, int]:
+        """Requests sent, connections opened and requests served on a reused connection."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections,
+                "connections_reused": max(self.requests - self.connections, 0),
+            }
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self.session.close()
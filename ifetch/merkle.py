@@ -0,0 +1,67 @@
+from typing import List
+
+from chunk_index import ChunkIndex
+from hashing import HashAlgorithm
+
+
+class MerkleTree:
+    """Binary hash tree over the chunk digests of a file.
+
+    Leaves are the chunk digests from a ChunkIndex; every inner node is the
+    hash of its two children concatenated. A node without a sibling is
+    carried up unchanged. Two trees over the same chunk boundaries can be
+    compared top-down, so only subtrees whose hashes differ are visited.
+    """
+
+    def __init__(self, leaves: List[bytes], hash_algorithm: HashAlgorithm):
+        """Build the tree.
+
+        Args:
+            leaves: Chunk digests in offset order
+            hash_algorithm: Backend used for the inner nodes
+        """
+        self.hash = hash_algorithm
+        self.levels: List[List[bytes]] = [list(leaves)]
+        level = self.levels[0]
+        while len(level) > 1:
+            parent = [
+                self.hash.digest(level[i] + level[i + 1]) if i + 1 < len(level) else level[i]
+                for i in range(0, len(level), 2)
+            ]
+            self.levels.append(parent)
+            level = parent
+
+    @classmethod
+    def from_index(cls, index: ChunkIndex, hash_algorithm: HashAlgorithm) -> "MerkleTree":
+        """Build the tree over every chunk of ``index``."""
+        return cls([index.digest(i) for i in range(len(index))], hash_algorithm)
+
+    @property
+    def root(self) -> bytes:
+        """Root hash; the hash of no data for an empty file."""
+        if not self.levels[0]:
+            return self.hash.digest(b'')
+        return self.levels[-1][0]
+
+    def __len__(self) -> int:
+        return len(self.levels[0])
+
+    def diff(self, other: "MerkleTree") -> List[int]:
+        """Return the indexes of the leaves that differ from ``other``.
+
+        Trees with a different number of leaves cannot be aligned; every
+        leaf of this tree is reported then.
+        """
+        if len(self) != len(other) or len(self.levels) != len(other.levels):
+            return list(range(len(self)))
+
+        suspects = [0] if self.levels[-1] != other.levels[-1] else []
+        for depth in range(len(self.levels) - 1, 0, -1):
+            below, other_below = self.levels[depth - 1], other.levels[depth - 1]
+            children = []
+            for node in suspects:
+                for child in (2 * node, 2 * node + 1):
+                    if child < len(below) and below[child] != other_below[child]:
+                        children.append(child)
+            suspects = children
+        return suspects
@@ -5,7 +5,10 @@ class DownloadStatus:
         path: str,
         size: int = 0,
         downloaded: int = 0,
+        reused: int = 0,
+        bytes_changed: int = 0,
         checksum: str = "",  # Default to empty string
+        checksum_algorithm: str = "sha256",
         status: str = "pending",
         changes: int = 0,
         error: str = ""
@@ -13,7 +16,64 @@ class DownloadStatus:
         self.path = path
         self.size = size
         self.downloaded = downloaded
+        self.reused = reused  # Bytes copied from other local files instead of downloaded
+        self.bytes_changed = bytes_changed  # Bytes written because they differed locally
         self.checksum = checksum or ""  # Ensure it's never None
+        self.checksum_algorithm = checksum_algorithm
         self.status = status
         self.changes = changes
         self.error = error
+
+
+class DeltaResult:
+    """Model describing the outcome of a streaming delta pass."""
+    def __init__(self):
+        self.changed_ranges = []  # Merged (start, end) ranges that differed
+        self.bytes_received = 0
+        self.bytes_changed = 0
+        self.bytes_relocated = 0  # Local data reused at a different offset
+        self.index = None  # ChunkIndex of the remote chunks seen, from the pass's start offset
+
+    @property
+    def has_changes(self) -> bool:
+        """Whether the remote content differs from the local copy."""
+        return bool(self.changed_ranges) or self.bytes_relocated > 0
+
+    def add_changed(self, start: int, end: int) -> None:
+        """Record a changed range, extending the previous one when adjacent."""
+        if self.changed_ranges and self.changed_ranges[-1][1] + 1 == start:
+            self.changed_ranges[-1] = (self.changed_ranges[-1][0], end)
+        else:
+            self.changed_ranges.append((start, end))
+        self.bytes_changed += end - start + 1
+
+    def merge(self, other: "DeltaResult") -> None:
+        """Fold the result of a later pass into this one.
+
+        The remote indexes are joined when ``other`` continues exactly where
+        this pass ended; otherwise the index is dropped as incomplete.
+        """
+        if self.index is not None and other.index is not None and (
+            not other.index or other.index.start(0) == self.index.total_size
+        ):
+            self.index.extend(other.index)
+        else:
+            self.index = None
+        for start, end in other.changed_ranges:
+            self.add_changed(start, end)
+        self.bytes_received += other.bytes_received
+        self.bytes_relocated += other.bytes_relocated
+
+
+class RangeTask:
+    """A byte range being fetched, with its progress across attempts."""
+    def __init__(self, start: int, end: int, result: DeltaResult):
+        self.start = start  # First byte still to fetch; advances after broken streams
+        self.end = end
+        self.result = result  # Accumulates every attempt's delta for the range
+        self.attempts = 0
+        self.delay = 0.0  # Delay used before the latest retry
+        self.refreshes = 0  # Expired download URLs renewed for the range
+        self.transfer = None  # stall.Transfer of the attempt in flight
+        self.rival = None  # Hedged duplicate racing this task, if any
+        self.lost = False  # Set when the rival finished first (or this copy failed)
@@ -0,0 +1,259 @@
+import re
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from retry import RetryPolicy
+from stall import StallMonitor
+from transport import Transport, TransportError
+
+_CONTENT_RANGE = re.compile(r'bytes\s+(\d+)-(\d+)', re.IGNORECASE)
+_BOUNDARY = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+
+
+def iter_byteranges(blocks: Iterable[bytes], boundary: str) -> Iterator[Tuple[int, bytes, bool]]:
+    """Stream the parts of a ``multipart/byteranges`` body.
+
+    Part bodies are yielded as they arrive, never buffered whole.
+
+    Args:
+        blocks: The raw response body in pieces
+        boundary: Boundary from the Content-Type header
+
+    Yields:
+        (absolute offset, data, last piece of its part) tuples
+
+    Raises:
+        ValueError: If the body is malformed or ends inside a part
+    """
+    delimiter = b'--' + boundary.encode('latin-1')
+    source = iter(blocks)
+    buffer = bytearray()
+
+    def more() -> None:
+        data = next(source, None)
+        if data is None:
+            raise ValueError("multipart/byteranges body ended early")
+        buffer.extend(data)
+
+    while True:
+        while True:
+            found = buffer.find(delimiter)
+            if found >= 0:
+                break
+            # Keep a possible partial delimiter at the end of the buffer
+            del buffer[:max(len(buffer) - len(delimiter), 0)]
+            more()
+        del buffer[:found + len(delimiter)]
+        while len(buffer) < 2:
+            more()
+        if buffer[:2] == b'--':
+            return
+
+        while True:
+            header_end = buffer.find(b'\r\n\r\n')
+            if header_end >= 0:
+                break
+            more()
+        headers = bytes(buffer[:header_end]).decode('latin-1')
+        del buffer[:header_end + 4]
+        match = _CONTENT_RANGE.search(headers)
+        if not match:
+            raise ValueError("multipart/byteranges part without Content-Range")
+
+        offset, last = int(match.group(1)), int(match.group(2))
+        remaining = last - offset + 1
+        while remaining:
+            if not buffer:
+                more()
+            take = min(remaining, len(buffer))
+            remaining -= take
+            yield offset, bytes(buffer[:take]), remaining == 0
+            del buffer[:take]
+            offset += take
+
+
+class MultiRangeFetcher:
+    """Fetch scattered byte ranges with few ``Range: bytes=a-b,c-d`` requests.
+
+    Ranges are batched into one request each, up to ``max_ranges`` ranges
+    and ``max_bytes`` bytes. Parts of a ``multipart/byteranges`` answer (or
+    a single 206 part, when the server merges ranges) are written at their
+    offsets. A host that answers with the whole file (200) or leaves ranges
+    out is remembered as not supporting multi-range, and later batches for
+    it go straight to the caller's single-range path.
+
+    Like single-range requests, each request goes through the retry policy's
+    circuit breaker and budget, and its body is watched for stalls. A failed
+    request is not retried here: its missing ranges are left to the caller.
+    """
+
+    def __init__(
+        self,
+        transport: Transport,
+        max_ranges: int = 32,
+        max_bytes: Optional[int] = None,
+        retry: Optional[RetryPolicy] = None,
+        stalls: Optional[StallMonitor] = None,
+        current_url: Optional[Callable[[str], str]] = None
+    ):
+        """Initialize the fetcher.
+
+        Args:
+            transport: HTTP backend used for the requests
+            max_ranges: Most ranges in one request (below 2 disables batching)
+            max_bytes: Most bytes requested at once (None for no limit)
+            retry: Policy that sees the outcome of every request
+            stalls: Monitor that aborts bodies arriving too slowly
+            current_url: Returns the latest renewal of a download URL
+        """
+        self.transport = transport
+        self.max_ranges = max_ranges
+        self.max_bytes = max_bytes
+        self.retry = retry or RetryPolicy()
+        self.stalls = stalls or StallMonitor()
+        self.current_url = current_url
+        self._lock = threading.Lock()
+        self._unsupported: Dict[str, str] = {}
+        self.requests = 0
+        self.ranges_served = 0
+
+    def supported(self, url: str) -> bool:
+        with self._lock:
+            return self.max_ranges > 1 and urlsplit(url).netloc not in self._unsupported
+
+    def _refuse(self, url: str, reason: str) -> None:
+        with self._lock:
+            self._unsupported[urlsplit(url).netloc] = reason
+
+    def batches(self, ranges: List[Tuple[int, int]]) -> List[List[Tuple[int, int]]]:
+        """Group sorted ranges into requests within the count and byte limits."""
+        groups: List[List[Tuple[int, int]]] = []
+        size = 0
+        for start, end in ranges:
+            length = end - start + 1
+            if (
+                not groups or len(groups[-1]) >= self.max_ranges
+                or (self.max_bytes and size + length > self.max_bytes)
+            ):
+                groups.append([])
+                size = 0
+            groups[-1].append((start, end))
+            size += length
+        return groups
+
+    def fetch(
+        self,
+        url: str,
+        ranges: List[Tuple[int, int]],
+        write_at: Callable[[int, bytes], None],
+        throttle: Optional[Callable[[Iterable[bytes]], Iterable[bytes]]] = None,
+        timeout: float = 60
+    ) -> Tuple[int, List[Tuple[int, int]]]:
+        """Fetch ranges in multi-range requests where the server allows it.
+
+        Args:
+            url: Content URL
+            ranges: Sorted, non-overlapping inclusive ranges
+            write_at: Receives (absolute offset, data) for every piece
+            throttle: Optional wrapper for the raw body (e.g. a rate limiter)
+            timeout: Request timeout in seconds
+
+        Returns:
+            Bytes written, and the ranges still to fetch one by one (all of
+            them when multi-range is unsupported or a request failed)
+        """
+        written = 0
+        leftover: List[Tuple[int, int]] = []
+        for batch in self.batches(ranges):
+            if len(batch) < 2 or not self.supported(url):
+                leftover.extend(batch)
+                continue
+            done, covered = self._fetch_batch(url, batch, write_at, throttle, timeout)
+            written += done
+            for start, end in batch:
+                if any(a <= start and end <= b for a, b in covered):
+                    with self._lock:
+                        self.ranges_served += 1
+                else:
+                    leftover.append((start, end))
+        return written, leftover
+
+    def _fetch_batch(
+        self,
+        url: str,
+        batch: List[Tuple[int, int]],
+        write_at: Callable[[int, bytes], None],
+        throttle: Optional[Callable[[Iterable[bytes]], Iterable[bytes]]],
+        timeout: float
+    ) -> Tuple[int, List[Tuple[int, int]]]:
+        """One multi-range request; returns bytes written and fully received spans."""
+        with self._lock:
+            self.requests += 1
+        written = 0
+        covered: List[Tuple[int, int]] = []
+        if self.current_url is not None:
+            url = self.current_url(url)
+        # Leaving the block without an outcome (a malformed body) records a neutral one
+        with self.retry.attempt(url) as attempt:
+            try:
+                with self.transport.get(url, timeout=timeout, ranges=batch) as response:
+                    if response.status != 206:
+                        # The whole file is on its way; drop the connection instead
+                        attempt.success()
+                        self._refuse(url, f"status {response.status}")
+                        return 0, []
+                    transfer = self.stalls.watch(response, url)
+                    body = transfer.iter(response.iter_content(self.stalls.read_size(1024 * 1024)))
+                    if throttle is not None:
+                        body = throttle(body)
+
+                    content_type = response.headers.get('content-type', '')
+                    boundary = _BOUNDARY.search(content_type)
+                    try:
+                        if 'multipart/byteranges' in content_type.lower() and boundary:
+                            part_start = None
+                            for offset, data, last in iter_byteranges(body, boundary.group(1)):
+                                part_start = offset if part_start is None else part_start
+                                write_at(offset, data)
+                                written += len(data)
+                                if last:
+                                    covered.append((part_start, offset + len(data) - 1))
+                                    part_start = None
+                            attempt.success()
+                            return written, covered
+
+                        # A single part: the server merged the ranges or served one
+                        match = _CONTENT_RANGE.search(response.headers.get('content-range', ''))
+                        if not match:
+                            self._refuse(url, "206 without Content-Range")
+                            return 0, []
+                        offset = first = int(match.group(1))
+                        last = int(match.group(2))
+                        for data in body:
+                            write_at(offset, data)
+                            offset += len(data)
+                            written += len(data)
+                    finally:
+                        transfer.close()
+                    if offset == last + 1:
+                        covered.append((first, last))
+                    if not all(first <= a and b <= last for a, b in batch):
+                        self._refuse(url, "ranges left out")
+                    attempt.success()
+                    return written, covered
+            except TransportError as e:
+                # Whatever was not received is fetched again range by range
+                attempt.failure(e)
+                return written, covered
+            except ValueError:
+                return written, covered
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "enabled": self.max_ranges > 1,
+                "requests": self.requests,
+                "ranges_served": self.ranges_served,
+                "unsupported_hosts": dict(self._unsupported),
+            }
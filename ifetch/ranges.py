@@ -0,0 +1,50 @@
+from typing import Iterable, List, Optional, Tuple
+
+
+def coalesce_ranges(
+    ranges: Iterable[Tuple[int, int]],
+    max_gap: int = 0,
+    max_bytes: Optional[int] = None
+) -> List[Tuple[int, int]]:
+    """Merge inclusive (start, end) byte ranges into fewer requests.
+
+    Every request costs a round trip while bytes in a gap only cost
+    bandwidth, so ranges separated by at most ``max_gap`` unwanted bytes are
+    fetched as one. A good gap is about round-trip time times bandwidth.
+    Ranges that touch or overlap are always merged.
+
+    Args:
+        ranges: Byte ranges in any order
+        max_gap: Largest number of unneeded bytes to fetch to save a request
+        max_bytes: Largest size of one resulting range; longer ranges are
+            split (None for no limit)
+
+    Returns:
+        Sorted, non-overlapping ranges covering every input range
+    """
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged:
+            prev_start, prev_end = merged[-1]
+            touching = start <= prev_end + 1
+            fits = max_bytes is None or max(end, prev_end) - prev_start + 1 <= max_bytes
+            if touching or (start - prev_end - 1 <= max_gap and fits):
+                merged[-1] = (prev_start, max(prev_end, end))
+                continue
+        merged.append((start, end))
+
+    if not max_bytes:
+        return merged
+
+    result = []
+    for start, end in merged:
+        while end - start + 1 > max_bytes:
+            result.append((start, start + max_bytes - 1))
+            start += max_bytes
+        result.append((start, end))
+    return result
+
+
+def range_bytes(ranges: Iterable[Tuple[int, int]]) -> int:
+    """Total number of bytes covered by inclusive ranges (assumed disjoint)."""
+    return sum(end - start + 1 for start, end in ranges)
@@ -0,0 +1,142 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from chunking import parse_size
+
+
+def parse_rate(value: Any) -> Optional[int]:
+    """Parse a rate in bytes per second (``500K``, ``2M``); 0/``off`` means unlimited."""
+    text = str(value).strip().lower()
+    if text in ('', 'off', 'none', 'unlimited'):
+        return None
+    return parse_size(text.rstrip('/s'), allow_zero=True) or None
+
+
+def _parse_clock(text: str) -> int:
+    hours, _, minutes = text.strip().partition(':')
+    try:
+        value = int(hours) * 60 + int(minutes or 0)
+    except ValueError:
+        raise ValueError(f"Invalid time of day: {text}")
+    if not 0 <= value <= 24 * 60:
+        raise ValueError(f"Invalid time of day: {text}")
+    return value
+
+
+def parse_schedule(spec: str) -> List[Tuple[int, int, Optional[int]]]:
+    """Parse ``HH:MM-HH:MM=RATE`` windows separated by commas.
+
+    A window may wrap past midnight (``22:00-06:00=off``). Times are local.
+
+    Returns:
+        (start minute, end minute, bytes per second or None) tuples
+    """
+    windows = []
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        span, sep, rate = part.partition('=')
+        start, dash, end = span.partition('-')
+        if not sep or not dash:
+            raise ValueError(f"Invalid schedule window '{part}', expected HH:MM-HH:MM=RATE")
+        windows.append((_parse_clock(start), _parse_clock(end), parse_rate(rate)))
+    return windows
+
+
+class RateLimiter:
+    """Token bucket shared by every worker, segment and file of a job.
+
+    Callers reserve bytes before (or right after) reading them and sleep for
+    the returned delay. Reservations are granted in arrival order, so files
+    read in similar pieces get similar shares of the bandwidth. A reservation
+    is a lock and a few additions, cheap enough to make per network read.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[int] = None,
+        schedule: Optional[List[Tuple[int, int, Optional[int]]]] = None,
+        burst: float = 1.0
+    ):
+        """Initialize the limiter.
+
+        Args:
+            rate: Bytes per second outside schedule windows (None: unlimited)
+            schedule: Time-of-day windows from ``parse_schedule``
+            burst: Seconds of unused bandwidth that may be spent at once
+        """
+        self.rate = rate
+        self.schedule = schedule or []
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._next = 0.0  # Monotonic time when the bandwidth is free again
+        self._current: Optional[int] = rate
+        self._checked = 0.0
+        self.bytes = 0
+        self.waited = 0.0
+        self._first: Optional[float] = None
+        self._last = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.rate or self.schedule)
+
+    def _rate_now(self, now: float) -> Optional[int]:
+        """Rate in effect, re-read from the schedule at most once a second."""
+        if self.schedule and now - self._checked >= 1.0:
+            self._checked = now
+            local = time.localtime()
+            minute = local.tm_hour * 60 + local.tm_min
+            self._current = self.rate
+            for start, end, rate in self.schedule:
+                inside = start <= minute < end if start <= end else (minute >= start or minute < end)
+                if inside:
+                    self._current = rate
+                    break
+        return self._current
+
+    def reserve(self, size: int) -> float:
+        """Account for ``size`` bytes and return how long to wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            if self._first is None:
+                # No burst credit before the first byte
+                self._first = self._next = now
+            self._last = now
+            self.bytes += size
+            rate = self._rate_now(now)
+            if not rate:
+                return 0.0
+            # Unused time beyond the burst allowance is forfeited
+            self._next = max(self._next, now - self.burst)
+            delay = max(self._next - now, 0.0)
+            self._next += size / rate
+            # The reserved bytes count as read once their time slot has passed
+            self._last = self._next
+            self.waited += delay
+            return delay
+
+    def consume(self, size: int) -> None:
+        """Block until ``size`` bytes fit in the limit."""
+        delay = self.reserve(size)
+        if delay:
+            time.sleep(delay)
+
+    def throttle(self, blocks: Iterable[bytes]) -> Iterator[bytes]:
+        """Pace a stream of body pieces through the limiter."""
+        for data in blocks:
+            self.consume(len(data))
+            yield data
+
+    def stats(self) -> Dict[str, Any]:
+        """Configured limit, bytes read and the effective rate for the report."""
+        with self._lock:
+            elapsed = self._last - self._first if self._first is not None else 0.0
+            return {
+                "limit": self._current if self.enabled else None,
+                "scheduled": bool(self.schedule),
+                "bytes": self.bytes,
+                "throttled_seconds": round(self.waited, 3),
+                "effective_rate": round(self.bytes / elapsed) if elapsed > 0 else None,
+            }
@@ -0,0 +1,322 @@
+import json
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from transport import TransportError
+
+# Error classes
+RETRYABLE = 'retryable'
+AUTH_EXPIRED = 'auth_expired'
+FATAL = 'fatal'
+
+# Statuses meaning the signed URL or session is no longer accepted
+AUTH_STATUSES = {401, 403, 410}
+
+
+def classify(error: BaseException) -> str:
+    """Sort an error into RETRYABLE, AUTH_EXPIRED or FATAL.
+
+    Broken streams and connection failures are retryable, as are 5xx, 408
+    and 429 answers. 401/403/410 mean the download URL expired. Other
+    client errors and local failures will not improve with another attempt.
+    """
+    cause = error.__cause__ if error.__cause__ is not None else error
+    if isinstance(cause, TransportError):
+        if cause.status in AUTH_STATUSES:
+            return AUTH_EXPIRED
+        return RETRYABLE if cause.retryable else FATAL
+    if isinstance(error, TransportError):
+        return RETRYABLE if error.retryable else FATAL
+    if isinstance(cause, (ConnectionError, TimeoutError)):
+        return RETRYABLE
+    if isinstance(cause, OSError):
+        return FATAL  # Local disk errors such as a full disk
+    return RETRYABLE
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds requested by a Retry-After header on the error, if any."""
+    cause = error.__cause__ if error.__cause__ is not None else error
+    value = getattr(cause, 'headers', {}).get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Pauses all traffic to a host after consecutive transient failures.
+
+    After ``threshold`` failures in a row the host is open for ``cooldown``
+    seconds and every request for it waits. Then a single probe request is
+    let through: success closes the circuit, failure reopens it with twice
+    the cooldown (up to ``max_cooldown``). An outcome that says nothing
+    about the host (e.g. a 404) only ends the probe. If a probe is never
+    recorded, a waiting request takes over after ``probe_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 5,
+        cooldown: float = 30.0,
+        max_cooldown: float = 300.0,
+        logger: Optional[logging.Logger] = None,
+        probe_timeout: float = 30.0
+    ):
+        """Initialize the breaker.
+
+        Args:
+            threshold: Consecutive failures that open a host (0 disables)
+            cooldown: First pause in seconds
+            max_cooldown: Longest pause after repeated failed probes
+            logger: Receives ``circuit_open`` / ``circuit_closed`` events
+            probe_timeout: Seconds after which a silent probe is replaced
+        """
+        self.threshold = threshold
+        self.logger = logger
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.probe_timeout = probe_timeout
+        self._cond = threading.Condition()
+        self._failures: Dict[str, int] = {}
+        self._open_until: Dict[str, float] = {}
+        self._backoff: Dict[str, float] = {}
+        self._probing: Dict[str, float] = {}  # Host -> time its probe started
+        self.trips = 0
+
+    def before_request(self, host: str) -> bool:
+        """Block while the host's circuit is open or another request probes it.
+
+        Returns:
+            True if this request is the host's probe; its outcome must then
+            be passed to ``record`` with ``probe=True``
+        """
+        if not self.threshold:
+            return False
+        with self._cond:
+            while True:
+                until = self._open_until.get(host)
+                if until is None:
+                    return False
+                now = time.monotonic()
+                if until > now:
+                    self._cond.wait(until - now)
+                    continue
+                started = self._probing.get(host)
+                if started is None or now - started >= self.probe_timeout:
+                    self._probing[host] = now
+                    return True
+                self._cond.wait(min(1.0, started + self.probe_timeout - now))
+
+    def record(self, host: str, failed: Optional[bool], probe: bool = False) -> Optional[float]:
+        """Record a request outcome; returns the cooldown if the circuit opened.
+
+        Args:
+            host: Host the request went to
+            failed: True for a transient failure, False for a success and
+                None for an outcome that says nothing about the host
+            probe: Whether the request was the host's probe
+        """
+        if not self.threshold:
+            return None
+        with self._cond:
+            probing = self._probing.pop(host, None) is not None if probe else False
+            if failed is None:
+                self._cond.notify_all()
+                return None
+            if not failed:
+                self._failures.pop(host, None)
+                if self._open_until.pop(host, None) is not None and self.logger:
+                    self.logger.info(json.dumps({"event": "circuit_closed", "host": host}))
+                self._backoff.pop(host, None)
+                self._cond.notify_all()
+                return None
+
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if not probing and (failures < self.threshold or host in self._open_until):
+                return None
+            cooldown = self._backoff.get(host, self.cooldown / 2) * 2
+            cooldown = min(cooldown, self.max_cooldown)
+            self._backoff[host] = cooldown
+            self._open_until[host] = time.monotonic() + cooldown
+            self.trips += 1
+            self._cond.notify_all()
+            if self.logger:
+                self.logger.warning(json.dumps({
+                    "event": "circuit_open",
+                    "host": host,
+                    "failures": failures,
+                    "pause": cooldown
+                }))
+            return cooldown
+
+    def open_hosts(self) -> Dict[str, float]:
+        with self._cond:
+            now = time.monotonic()
+            return {host: round(until - now, 1) for host, until in self._open_until.items() if until > now}
+
+
+class Attempt:
+    """One request's outcome, reported to the circuit breaker exactly once.
+
+    Use it as a context manager around the request: if neither ``success``
+    nor ``failure`` was called by the end of the block (the result was
+    discarded, or an unexpected error escaped), the outcome is recorded as
+    neutral, so a probe never stays claimed.
+    """
+
+    def __init__(self, policy: "RetryPolicy", host: str, probe: bool):
+        self.policy = policy
+        self.host = host
+        self.probe = probe  # Whether this request probes an open circuit
+        self.done = False
+
+    def success(self) -> None:
+        self._finish(False)
+
+    def failure(self, error: BaseException) -> None:
+        """Record a failed request; only transient failures count against the host."""
+        kind = classify(error)
+        with self.policy._lock:
+            self.policy.by_class[kind] += 1
+        self._finish(True if kind == RETRYABLE else None)
+
+    def _finish(self, failed: Optional[bool]) -> None:
+        if not self.done:
+            self.done = True
+            self.policy.breaker.record(self.host, failed, probe=self.probe)
+
+    def __enter__(self) -> "Attempt":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._finish(None)
+
+
+class RetryPolicy:
+    """Decides whether and when a failed request is tried again.
+
+    Delays use decorrelated jitter (each delay drawn between ``base`` and
+    three times the previous one, capped), so workers that failed together
+    do not retry together; a Retry-After header sets a floor. A job-wide
+    retry budget earns ``budget`` retries per request sent, banking at most
+    ``reserve``, so an outage cannot turn into a retry storm.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base: float = 1.0,
+        cap: float = 60.0,
+        budget: float = 0.2,
+        reserve: int = 20,
+        max_retry_after: float = 300.0,
+        breaker: Optional[CircuitBreaker] = None,
+        rng: Optional[random.Random] = None
+    ):
+        """Initialize the policy.
+
+        Args:
+            max_retries: Attempts per request before giving up
+            base: Smallest delay in seconds
+            cap: Largest jittered delay in seconds
+            budget: Retries earned per request sent (0 for no budget)
+            reserve: Retries that can be banked (and are available at the start)
+            max_retry_after: Longest Retry-After honored; longer waits fail
+            breaker: Per-host circuit breaker (None to disable)
+            rng: Random source for the jitter
+        """
+        self.max_retries = max_retries
+        self.base = base
+        self.cap = cap
+        self.budget = budget
+        self.max_retry_after = max_retry_after
+        self.breaker = breaker or CircuitBreaker(threshold=0)
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._tokens = float(reserve)
+        self._reserve = float(reserve)
+        self.requests = 0
+        self.retries = 0
+        self.budget_exhausted = 0
+        self.by_class = {RETRYABLE: 0, AUTH_EXPIRED: 0, FATAL: 0}
+
+    @staticmethod
+    def host(url: str) -> str:
+        return urlsplit(url).netloc
+
+    def attempt(self, url: str) -> Attempt:
+        """Wait for the host's circuit breaker and count the request.
+
+        Returns:
+            The Attempt to report the request's outcome on
+        """
+        host = self.host(url)
+        probe = self.breaker.before_request(host)
+        with self._lock:
+            self.requests += 1
+            if self.budget:
+                self._tokens = min(self._tokens + self.budget, self._reserve)
+        return Attempt(self, host, probe)
+
+    def backoff(self, previous_delay: float = 0.0) -> float:
+        """Next decorrelated-jitter delay after ``previous_delay``."""
+        with self._lock:
+            return min(self.cap, self._rng.uniform(self.base, max(previous_delay, self.base) * 3))
+
+    def on_failure(self, url: str, error: BaseException, attempt: int, previous_delay: float) -> Optional[float]:
+        """Decide whether and when to retry a failed attempt.
+
+        The failure itself is recorded through the request's Attempt.
+
+        Args:
+            url: Requested URL
+            error: The failure
+            attempt: Number of attempts made so far
+            previous_delay: Delay used before this attempt (0 for the first)
+
+        Returns:
+            Seconds to wait before retrying, or None to give up
+        """
+        if classify(error) != RETRYABLE or attempt >= self.max_retries:
+            return None
+
+        with self._lock:
+            if self.budget:
+                if self._tokens < 1:
+                    self.budget_exhausted += 1
+                    return None
+                self._tokens -= 1
+            self.retries += 1
+        delay = self.backoff(previous_delay)
+
+        requested = retry_after(error)
+        if requested is not None:
+            if requested > self.max_retry_after:
+                return None
+            delay = max(delay, requested)
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "requests": self.requests,
+                "retries": self.retries,
+                "budget_exhausted": self.budget_exhausted,
+                "errors": dict(self.by_class),
+            }
+        stats["circuit_trips"] = self.breaker.trips
+        stats["open_hosts"] = self.breaker.open_hosts()
+        return stats
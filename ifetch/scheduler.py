@@ -0,0 +1,41 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, List, Optional, Tuple
+
+
+class DelayedQueue:
+    """Thread-safe heap of work items keyed by the time they become eligible.
+
+    Failed work is pushed back with its retry delay instead of a worker
+    sleeping on it, so the worker can move on to other items meanwhile.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._order = itertools.count()  # Keeps equal times in FIFO order
+        self._lock = threading.Lock()
+
+    def push(self, item: Any, delay: float = 0.0) -> None:
+        """Add an item that becomes eligible ``delay`` seconds from now."""
+        with self._lock:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._order), item))
+
+    def pop_ready(self) -> Optional[Any]:
+        """Remove and return the earliest eligible item, or None if none is due."""
+        with self._lock:
+            if self._heap and self._heap[0][0] <= time.monotonic():
+                return heapq.heappop(self._heap)[2]
+            return None
+
+    def next_delay(self) -> Optional[float]:
+        """Seconds until the earliest item is due (0 if one is due, None if empty)."""
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(self._heap[0][0] - time.monotonic(), 0.0)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._heap)
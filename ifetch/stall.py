@@ -0,0 +1,187 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from transport import TransportError, TransportResponse
+
+
+class Transfer:
+    """One response body being read, as seen by the StallMonitor.
+
+    Only the time spent waiting for the network counts: while the consumer
+    hashes, writes or is held back by the rate limiter, the clock is stopped.
+    """
+
+    def __init__(self, monitor: "StallMonitor", response: TransportResponse, label: str):
+        self.monitor = monitor
+        self.response = response
+        self.label = label
+        self.bytes = 0
+        self.busy = 0.0  # Seconds spent waiting for data so far
+        self.waiting_since: Optional[float] = None
+        self.samples: Deque[Tuple[float, int]] = deque()  # (busy, bytes) at each check
+        self.reason: Optional[str] = None  # Set once aborted
+
+    def abort(self, reason: str) -> None:
+        """Interrupt the transfer; its reader fails with ``reason``."""
+        if self.reason is None:
+            self.reason = reason
+            self.response.abort()
+
+    def busy_at(self, now: float) -> float:
+        return self.busy + (now - self.waiting_since if self.waiting_since is not None else 0.0)
+
+    def _timed(self, read: Callable[..., Any], *args: Any) -> Any:
+        """Call a blocking read, counting its duration as network waiting."""
+        monitor = self.monitor
+        with monitor._lock:
+            self.waiting_since = time.monotonic()
+        try:
+            return read(*args)
+        except StopIteration:
+            raise
+        except Exception as e:
+            if self.reason is not None:
+                raise TransportError(self.reason) from e
+            raise
+        finally:
+            with monitor._lock:
+                self.busy = self.busy_at(time.monotonic())
+                self.waiting_since = None
+
+    def iter(self, blocks: Iterable[bytes]) -> Iterator[bytes]:
+        """Pass the body through while timing the reads.
+
+        Raises:
+            TransportError: If the transfer was aborted, even when the
+                backend reported a clean end of the body
+        """
+        self.monitor._add(self)
+        blocks = iter(blocks)
+        try:
+            while self.reason is None:
+                try:
+                    data = self._timed(next, blocks)
+                except StopIteration:
+                    break
+                self.bytes += len(data)
+                yield data
+            if self.reason is not None:
+                raise TransportError(self.reason)
+        finally:
+            self.close()
+
+    def readinto(self, read: Callable[[memoryview], int]) -> Callable[[memoryview], int]:
+        """Wrap a backend's ``readinto`` with the timing and abort handling of ``iter``.
+
+        The transfer is watched until ``close``.
+        """
+        self.monitor._add(self)
+
+        def timed(buffer: memoryview) -> int:
+            count = self._timed(read, buffer) if self.reason is None else 0
+            if not count and self.reason is not None:
+                raise TransportError(self.reason)
+            self.bytes += count
+            return count
+        return timed
+
+    def close(self) -> None:
+        """Stop watching the transfer."""
+        self.monitor._remove(self)
+
+
+class StallMonitor:
+    """Aborts transfers whose throughput stays below a floor.
+
+    A watchdog thread samples every active transfer about four times per
+    ``window``. When a transfer received less than ``floor`` bytes per
+    second over the last ``window`` seconds of network waiting, its
+    connection is aborted; the range is then retried on a fresh connection
+    instead of waiting for the read timeout. Transfers can also be aborted
+    directly, e.g. the loser of a hedged request.
+    """
+
+    def __init__(self, floor: int = 0, window: float = 10.0, logger: Optional[logging.Logger] = None):
+        """Initialize the monitor.
+
+        Args:
+            floor: Slowest acceptable rate in bytes/s (0 disables the watchdog)
+            window: Seconds a transfer may stay below ``floor``
+            logger: Receives ``transfer_stalled`` events
+        """
+        self.floor = floor
+        self.window = window
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._transfers: Set[Transfer] = set()
+        self._thread: Optional[threading.Thread] = None
+        self.stalls = 0
+
+    def read_size(self, chunk_size: int) -> int:
+        """Body piece size that lets the watchdog see progress within a window.
+
+        A transfer running right at the floor delivers a piece about every
+        quarter window, so slow-but-acceptable links are not mistaken for
+        stalled ones.
+        """
+        if not self.floor:
+            return chunk_size
+        return max(min(chunk_size, int(self.floor * self.window / 4)), 16 * 1024)
+
+    def watch(self, response: TransportResponse, label: str = '') -> Transfer:
+        """Track a response; read its body through ``Transfer.iter``."""
+        return Transfer(self, response, label)
+
+    def _add(self, transfer: Transfer) -> None:
+        with self._lock:
+            self._transfers.add(transfer)
+            if self.floor and self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name='stall-watchdog')
+                self._thread.start()
+
+    def _remove(self, transfer: Transfer) -> None:
+        with self._lock:
+            self._transfers.discard(transfer)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.window / 4)
+            for transfer, rate in self._check():
+                with self._lock:
+                    self.stalls += 1
+                if self.logger:
+                    self.logger.warning(json.dumps({
+                        "event": "transfer_stalled",
+                        "url": transfer.label.split('?')[0],
+                        "rate": int(rate),
+                        "floor": self.floor,
+                        "bytes": transfer.bytes
+                    }))
+                transfer.abort(f"Transfer stalled below {self.floor} B/s for {self.window:g}s")
+
+    def _check(self) -> List[Tuple[Transfer, float]]:
+        """Record a sample per transfer and return those below the floor."""
+        now = time.monotonic()
+        stalled = []
+        with self._lock:
+            for transfer in self._transfers:
+                busy = transfer.busy_at(now)
+                samples = transfer.samples
+                samples.append((busy, transfer.bytes))
+                # Keep the newest sample at least a window old as the baseline
+                while len(samples) > 1 and busy - samples[1][0] >= self.window:
+                    samples.popleft()
+                span = busy - samples[0][0]
+                if span >= self.window and transfer.reason is None:
+                    rate = (transfer.bytes - samples[0][1]) / span
+                    if rate < self.floor:
+                        stalled.append((transfer, rate))
+        return stalled
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"floor": self.floor, "window": self.window, "stalls": self.stalls}
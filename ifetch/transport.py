@@ -0,0 +1,501 @@
+import http.client
+import queue
+import socket
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import requests
+import urllib3
+
+from http_pool import ConnectionPool
+
+try:
+    import httpx
+except ImportError:  # Optional dependency
+    httpx = None
+
+try:
+    import pycurl
+except ImportError:  # Optional dependency
+    pycurl = None
+
+
+# Statuses worth another attempt; other 4xx answers will not change on retry
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class TransportError(Exception):
+    """A request failed before or while its body was read.
+
+    ``retryable`` tells the caller whether another attempt may succeed.
+    ``status`` and ``headers`` are set when the server answered with an
+    HTTP error.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        status: Optional[int] = None,
+        retryable: bool = True,
+        headers: Optional[Dict[str, str]] = None
+    ):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.headers = headers or {}
+
+
+def _status_error(status: int, url: str, headers: Dict[str, str]) -> TransportError:
+    return TransportError(
+        f"HTTP {status} for {url.split('?')[0]}",
+        status=status,
+        retryable=status in RETRYABLE_STATUSES or status >= 500,
+        headers=headers
+    )
+
+
+def _shutdown(sock: Any) -> bool:
+    """Shut a socket down so a read blocked on it on another thread returns."""
+    if sock is None:
+        return False
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass  # Already closed by the peer
+    return True
+
+
+def _range_header(
+    start: Optional[int],
+    end: Optional[int],
+    ranges: Optional[Sequence[Tuple[int, int]]] = None
+) -> Dict[str, str]:
+    if ranges:
+        return {'Range': 'bytes=' + ','.join(f'{a}-{b}' for a, b in ranges)}
+    if start is None:
+        return {}
+    return {'Range': f"bytes={start}-{'' if end is None else end}"}
+
+
+class TransportResponse:
+    """Streaming body of a successful (2xx) GET.
+
+    Backends fill in ``status``, ``url`` and ``headers`` (lower-case names);
+    errors while reading the body surface as TransportError.
+    """
+
+    status: int = 0
+    url: str = ''
+    headers: Dict[str, str] = {}
+    _blocks: Optional[Iterator[bytes]] = None
+    _leftover = memoryview(b'')
+
+    def iter_content(self, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        """Yield the body in pieces of about ``chunk_size`` bytes."""
+        raise NotImplementedError
+
+    def readinto(self, buffer: memoryview) -> int:
+        """Read the next bytes of the body into ``buffer``.
+
+        Use either this or ``iter_content`` for a response, not both. This
+        fallback copies from ``iter_content``; backends that can receive
+        straight into the buffer override it.
+
+        Returns:
+            Bytes read, 0 at the end of the body
+        """
+        if not self._leftover:
+            if self._blocks is None:
+                self._blocks = self.iter_content(len(buffer))
+            self._leftover = memoryview(next(self._blocks, b''))
+        count = min(len(buffer), len(self._leftover))
+        buffer[:count] = self._leftover[:count]
+        self._leftover = self._leftover[count:]
+        return count
+
+    def close(self) -> None:
+        """Release the connection, discarding any unread body."""
+
+    def abort(self) -> None:
+        """Interrupt a body being read on another thread.
+
+        The reader gets an error or an early end of the body; the connection
+        is not reused.
+        """
+        self.close()
+
+    def __enter__(self) -> "TransportResponse":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class Transport:
+    """HTTP client backend used for all range requests."""
+
+    name = ''
+
+    def get(
+        self,
+        url: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        timeout: float = 60,
+        ranges: Optional[Sequence[Tuple[int, int]]] = None
+    ) -> TransportResponse:
+        """Send a GET, optionally for the inclusive byte range ``start``-``end``.
+
+        ``ranges`` asks for several inclusive ranges in one request instead;
+        the server may answer with ``multipart/byteranges``.
+
+        Raises:
+            TransportError: On connection failures and non-2xx answers
+        """
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the summary report."""
+        return {}
+
+    def close(self) -> None:
+        """Close pooled connections."""
+
+
+class _RequestsResponse(TransportResponse):
+    def __init__(self, response: requests.Response):
+        self._response = response
+        self.status = response.status_code
+        self.url = response.url
+        self.headers = {k.lower(): v for k, v in response.headers.items()}
+        # Plain bodies can be received straight from http.client, which
+        # reads into the caller's buffer; chunked or compressed ones go
+        # through urllib3's decoding
+        fp = getattr(response.raw, '_fp', None)
+        self._direct = (
+            isinstance(fp, http.client.HTTPResponse)
+            and self.headers.get('content-encoding', 'identity') == 'identity'
+            and 'chunked' not in self.headers.get('transfer-encoding', '')
+        )
+
+    def iter_content(self, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        try:
+            yield from self._response.iter_content(chunk_size=chunk_size)
+        except requests.RequestException as e:
+            raise TransportError(str(e)) from e
+
+    def readinto(self, buffer: memoryview) -> int:
+        if not self._direct:
+            return super().readinto(buffer)
+        fp = self._response.raw._fp
+        try:
+            count = fp.readinto(buffer)
+        except (OSError, http.client.HTTPException, urllib3.exceptions.HTTPError) as e:
+            raise TransportError(str(e)) from e
+        if not count and buffer:
+            # http.client reports a connection closed mid-body as a plain
+            # end of body, without urllib3's Content-Length check
+            missing = getattr(fp, 'length', None)
+            if missing:
+                raise TransportError(f"Connection closed with {missing} bytes of the body missing")
+        if not count:
+            # Fully read: let close() return the connection to the pool
+            self._response._content_consumed = True
+        return count
+
+    def close(self) -> None:
+        self._response.close()
+
+    def abort(self) -> None:
+        if not _shutdown(getattr(getattr(self._response.raw, '_connection', None), 'sock', None)):
+            self.close()
+
+
+class RequestsTransport(Transport):
+    """``requests`` over the shared keep-alive ConnectionPool."""
+
+    name = 'requests'
+
+    def __init__(self, max_per_host: int = 4):
+        self.pool = ConnectionPool(max_per_host=max_per_host)
+
+    def get(self, url: str, start: Optional[int] = None, end: Optional[int] = None,
+            timeout: float = 60, ranges: Optional[Sequence[Tuple[int, int]]] = None) -> TransportResponse:
+        try:
+            response = self.pool.get(url, headers=_range_header(start, end, ranges), stream=True, timeout=timeout)
+        except requests.RequestException as e:
+            raise TransportError(str(e)) from e
+        if response.status_code >= 400:
+            headers = {k.lower(): v for k, v in response.headers.items()}
+            response.close()
+            raise _status_error(response.status_code, url, headers)
+        return _RequestsResponse(response)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"transport": self.name, **self.pool.stats()}
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class _HttpxResponse(TransportResponse):
+    def __init__(self, response: Any):
+        self._response = response
+        self.status = response.status_code
+        self.url = str(response.url)
+        self.headers = {k.lower(): v for k, v in response.headers.items()}
+
+    def iter_content(self, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        try:
+            yield from self._response.iter_bytes(chunk_size=chunk_size)
+        except httpx.HTTPError as e:
+            raise TransportError(str(e)) from e
+
+    def close(self) -> None:
+        self._response.close()
+
+    def abort(self) -> None:
+        stream = self._response.extensions.get('network_stream')
+        # An HTTP/2 connection carries other transfers: only reset this stream
+        if self._response.http_version == 'HTTP/2' or stream is None or not _shutdown(
+            stream.get_extra_info('socket')
+        ):
+            self.close()
+
+
+class HttpxTransport(Transport):
+    """``httpx`` client; with ``http2`` all ranges to a host share one
+    multiplexed connection (needs the ``h2`` package and an HTTPS server)."""
+
+    name = 'httpx'
+
+    def __init__(self, max_per_host: int = 4, http2: bool = False):
+        if httpx is None:
+            raise ValueError("The httpx transport needs the 'httpx' package (pip install httpx)")
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.http2 = http2
+        try:
+            self.client = httpx.Client(
+                http2=http2,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=None, max_keepalive_connections=max_per_host)
+            )
+        except ImportError as e:
+            raise ValueError("HTTP/2 needs the 'h2' package (pip install 'httpx[http2]')") from e
+
+    def get(self, url: str, start: Optional[int] = None, end: Optional[int] = None,
+            timeout: float = 60, ranges: Optional[Sequence[Tuple[int, int]]] = None) -> TransportResponse:
+        with self._lock:
+            self.requests += 1
+        request = self.client.build_request(
+            'GET', url, headers=_range_header(start, end, ranges), timeout=httpx.Timeout(timeout)
+        )
+        try:
+            response = self.client.send(request, stream=True)
+        except httpx.HTTPError as e:
+            raise TransportError(str(e)) from e
+        if response.status_code >= 400:
+            headers = {k.lower(): v for k, v in response.headers.items()}
+            response.close()
+            raise _status_error(response.status_code, url, headers)
+        return _HttpxResponse(response)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"transport": self.name, "http2": self.http2, "requests": self.requests}
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class _CurlResponse(TransportResponse):
+    """Body of a transfer that libcurl performs on a helper thread.
+
+    pycurl pushes data through callbacks, so the transfer runs on its own
+    thread and hands pieces over a small bounded queue; a slow consumer
+    therefore pauses the download instead of buffering the whole body.
+    """
+
+    _DONE = object()
+
+    def __init__(self, transport: "CurlTransport", handle: Any, url: str):
+        self._transport = transport
+        self._handle = handle
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=16)
+        self._headers_ready = threading.Event()
+        self._aborted = False
+        self._error: Optional[TransportError] = None
+        self.url = url
+        self.headers = {}
+
+        handle.setopt(pycurl.WRITEFUNCTION, self._on_data)
+        handle.setopt(pycurl.HEADERFUNCTION, self._on_header)
+        # Polled by libcurl even while no data arrives, so abort() takes effect
+        handle.setopt(pycurl.NOPROGRESS, 0)
+        handle.setopt(pycurl.XFERINFOFUNCTION, self._on_progress)
+        self._thread = threading.Thread(target=self._perform, daemon=True, name='curl')
+        self._thread.start()
+        self._headers_ready.wait()
+        if self._error is not None:
+            self._thread.join()
+            raise self._error
+
+    def _on_header(self, line: bytes) -> None:
+        text = line.decode('iso-8859-1').strip()
+        if text.startswith('HTTP/'):
+            # A new status line (e.g. after a redirect) resets the headers
+            self.status = int(text.split()[1])
+            self.headers = {}
+        elif ':' in text:
+            name, value = text.split(':', 1)
+            self.headers[name.strip().lower()] = value.strip()
+
+    def _on_data(self, data: bytes) -> Optional[int]:
+        if not self._headers_ready.is_set():
+            if self.status >= 400:
+                # Fail before the caller sees any of the error body
+                self._error = _status_error(self.status, self.url, self.headers)
+                self._aborted = True
+            self._headers_ready.set()
+        while not self._aborted:
+            try:
+                self._queue.put(data, timeout=0.1)
+                return None
+            except queue.Full:
+                continue
+        return 0  # Tells libcurl to abort the transfer
+
+    def _on_progress(self, *args: int) -> int:
+        return 1 if self._aborted else 0
+
+    def _perform(self) -> None:
+        try:
+            self._handle.perform()
+            if self.status >= 400 and self._error is None:
+                self._error = _status_error(self.status, self.url, self.headers)
+        except pycurl.error as e:
+            if not self._aborted:
+                self._error = TransportError(str(e.args[-1] if e.args else e))
+        finally:
+            self._headers_ready.set()
+            self._queue.put(self._DONE)
+
+    def iter_content(self, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        buffer = bytearray()
+        while True:
+            piece = self._queue.get()
+            if piece is self._DONE:
+                break
+            buffer += piece
+            while len(buffer) >= chunk_size:
+                yield bytes(buffer[:chunk_size])
+                del buffer[:chunk_size]
+        if self._error is not None:
+            raise self._error
+        if buffer:
+            yield bytes(buffer)
+
+    def abort(self) -> None:
+        # The transfer thread stops at its next callback; close() still releases it
+        self._aborted = True
+
+    def close(self) -> None:
+        if self._handle is None:
+            return
+        self._aborted = True
+        while self._thread.is_alive():
+            # Drain so the transfer thread is never stuck on a full queue
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                self._thread.join(0.05)
+        self._transport._release(self._handle)
+        self._handle = None
+
+
+class CurlTransport(Transport):
+    """libcurl through ``pycurl``; handles are reused, keeping their connections."""
+
+    name = 'curl'
+
+    def __init__(self, max_per_host: int = 4):
+        if pycurl is None:
+            raise ValueError("The curl transport needs the 'pycurl' package (pip install pycurl)")
+        self._lock = threading.Lock()
+        self._idle: List[Any] = []
+        self.max_idle = max_per_host
+        self.requests = 0
+        self.connections = 0
+
+    def _acquire(self) -> Any:
+        with self._lock:
+            self.requests += 1
+            if self._idle:
+                return self._idle.pop()
+        return pycurl.Curl()
+
+    def _release(self, handle: Any) -> None:
+        try:
+            opened = handle.getinfo(pycurl.NUM_CONNECTS)
+        except pycurl.error:
+            opened = 0
+        with self._lock:
+            self.connections += opened
+            if len(self._idle) < self.max_idle:
+                self._idle.append(handle)
+                return
+        handle.close()
+
+    def get(self, url: str, start: Optional[int] = None, end: Optional[int] = None,
+            timeout: float = 60, ranges: Optional[Sequence[Tuple[int, int]]] = None) -> TransportResponse:
+        handle = self._acquire()
+        handle.reset()
+        handle.setopt(pycurl.URL, url)
+        handle.setopt(pycurl.FOLLOWLOCATION, 1)
+        handle.setopt(pycurl.NOSIGNAL, 1)
+        handle.setopt(pycurl.CONNECTTIMEOUT, int(timeout))
+        # Equivalent of a read timeout: abort below 1 byte/s for `timeout` seconds
+        handle.setopt(pycurl.LOW_SPEED_LIMIT, 1)
+        handle.setopt(pycurl.LOW_SPEED_TIME, int(timeout))
+        handle.setopt(pycurl.HTTPHEADER, [f'{k}: {v}' for k, v in _range_header(start, end, ranges).items()])
+        try:
+            return _CurlResponse(self, handle, url)
+        except TransportError:
+            self._release(handle)
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "transport": self.name,
+                "requests": self.requests,
+                "connections_opened": self.connections,
+                "connections_reused": max(self.requests - self.connections, 0),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for handle in idle:
+            handle.close()
+
+
+TRANSPORTS: Dict[str, Callable[..., Transport]] = {
+    'requests': RequestsTransport,
+    'httpx': HttpxTransport,
+    'http2': lambda max_per_host=4: HttpxTransport(max_per_host, http2=True),
+    'curl': CurlTransport,
+}
+
+
+def get_transport(name: str, max_per_host: int = 4) -> Transport:
+    """Create a transport backend by name.
+
+    Raises:
+        ValueError: If the name is unknown or the backend's package is missing
+    """
+    key = name.strip().lower()
+    if key not in TRANSPORTS:
+        raise ValueError(f"Unknown transport '{name}'. Available: {', '.join(TRANSPORTS)}")
+    return TRANSPORTS[key](max_per_host=max_per_host)
@@ -0,0 +1,220 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+DEFAULT_ZONE = 'com.apple.CloudDocs'
+
+
+def url_expiry(url: str) -> Optional[float]:
+    """Expiry (Unix time) of a signed iCloud content URL, from its ``e`` parameter."""
+    values = parse_qs(urlsplit(url).query).get('e')
+    if not values:
+        return None
+    try:
+        expires = float(values[0])
+    except ValueError:
+        return None
+    return expires / 1000 if expires > 1e12 else expires  # Milliseconds on some hosts
+
+
+def resolve_download_url(item: Any) -> str:
+    """Ask iCloud for a file's signed content URL without fetching the body.
+
+    Uses the same ``download/by_id`` call as pyicloud's ``DriveNode.open``
+    but stops before the content request. The token's content signature is
+    kept in the item's data (see utils.content_signature). Items without
+    that API (or an unexpected answer) fall back to opening the item and
+    reading the final URL of the response.
+    """
+    data = getattr(item, 'data', None) or {}
+    drive = getattr(item, 'connection', None)
+    if data.get('docwsid') and hasattr(drive, '_document_root'):
+        params = dict(drive.params)
+        response = drive.session.get(
+            drive._document_root + f"/ws/{data.get('zone') or DEFAULT_ZONE}/download/by_id",
+            params={**params, 'document_id': data['docwsid']}
+        )
+        response.raise_for_status()
+        body = response.json()
+        token = body.get('data_token') or body.get('package_token') or {}
+        if token.get('signature'):
+            data['signature'] = token['signature']
+        if token.get('url'):
+            # pyicloud sends its session parameters with the content request
+            return requests.Request('GET', token['url'], params=params).prepare().url
+
+    with item.open(stream=True) as response:
+        return response.url
+
+
+def _item_key(item: Any) -> str:
+    data = getattr(item, 'data', None) or {}
+    return data.get('docwsid') or data.get('drivewsid') or f'id:{id(item)}'
+
+
+class URLResolver:
+    """Resolves and caches signed download URLs ahead of the transfer workers.
+
+    Files are enqueued as the traversal finds them. A small pool keeps up to
+    ``lookahead`` of them resolved in advance, so workers rarely wait for the
+    metadata round trip, without resolving so far ahead that URLs expire
+    unused. Cached URLs are re-resolved when they get within ``margin``
+    seconds of the expiry in their ``e`` parameter, or when the content
+    server rejects them (``refresh``). Every URL handed out maps back to its
+    file, so a transfer can swap in the newest URL between ranges.
+    """
+
+    def __init__(
+        self,
+        resolve: Callable[[Any], str],
+        logger: logging.Logger,
+        lookahead: int = 8,
+        workers: int = 2,
+        margin: float = 120.0
+    ):
+        """Initialize the resolver.
+
+        Args:
+            resolve: Returns the current download URL of an item (blocking)
+            logger: Receives ``url_refreshed`` events
+            lookahead: Files resolved in advance but not yet used
+            workers: Threads resolving enqueued files
+            margin: Seconds before expiry at which a URL is renewed
+        """
+        self.resolve = resolve
+        self.logger = logger
+        self.lookahead = lookahead
+        self.margin = margin
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='resolve')
+        self._lock = threading.Lock()
+        self._candidates: Deque[Tuple[str, Any]] = deque()
+        self._urls: Dict[str, Tuple[str, Optional[float]]] = {}
+        self._pending: Dict[str, Future] = {}
+        self._unused: set = set()
+        self._dropped: set = set()  # Discarded while their resolution was in flight
+        self._owner: Dict[str, str] = {}  # URL -> item key
+        self._items: Dict[str, Any] = {}
+        self.stats_counts = {"resolved": 0, "prefetched": 0, "cache_hits": 0, "expired": 0, "refreshed": 0}
+
+    def _fresh(self, key: str) -> Optional[str]:
+        entry = self._urls.get(key)
+        if entry is None:
+            return None
+        url, expires = entry
+        if expires is not None and expires - self.margin <= time.time():
+            self.stats_counts["expired"] += 1
+            return None
+        return url
+
+    def _store(self, key: str, url: str) -> None:
+        with self._lock:
+            self._urls[key] = (url, url_expiry(url))
+            self._owner[url] = key
+            self.stats_counts["resolved"] += 1
+
+    def _resolve_key(self, key: str) -> str:
+        url = self.resolve(self._items[key])
+        self._store(key, url)
+        return url
+
+    def _fill(self) -> None:
+        """Start resolutions until ``lookahead`` files are resolved or in flight.
+
+        Must be called with the lock held.
+        """
+        while self._candidates and len(self._unused) + len(self._pending) < self.lookahead:
+            key, item = self._candidates.popleft()
+            if key in self._pending or self._fresh(key):
+                continue
+            self._items[key] = item
+            future = self._pool.submit(self._prefetch, key)
+            self._pending[key] = future
+
+    def _prefetch(self, key: str) -> None:
+        try:
+            self._resolve_key(key)
+            with self._lock:
+                self.stats_counts["prefetched"] += 1
+                if key in self._dropped:
+                    self._dropped.discard(key)
+                else:
+                    self._unused.add(key)
+        except Exception:
+            pass  # The worker resolves the file again when it gets there
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def enqueue(self, item: Any) -> None:
+        """Note a file the workers will transfer soon, for resolution in advance."""
+        with self._lock:
+            self._candidates.append((_item_key(item), item))
+            self._fill()
+
+    def discard(self, item: Any) -> None:
+        """Forget a file that needs no (more) transfers, freeing its lookahead slot."""
+        key = _item_key(item)
+        with self._lock:
+            self._unused.discard(key)
+            if key in self._pending:
+                self._dropped.add(key)
+            else:
+                entry = self._urls.pop(key, None)
+                if entry is not None:
+                    self._owner.pop(entry[0], None)
+                self._items.pop(key, None)
+            self._fill()
+
+    def get(self, item: Any) -> str:
+        """Current download URL of an item, resolving it if needed."""
+        key = _item_key(item)
+        with self._lock:
+            self._items.setdefault(key, item)
+            future = self._pending.get(key)
+        if future is not None:
+            future.result()
+        with self._lock:
+            self._unused.discard(key)
+            url = self._fresh(key)
+            if url is not None:
+                self.stats_counts["cache_hits"] += 1
+            self._fill()
+        return url if url is not None else self._resolve_key(key)
+
+    def current(self, url: str) -> str:
+        """Newest URL for the file ``url`` was issued for, renewed if about to expire."""
+        with self._lock:
+            key = self._owner.get(url)
+            if key is None:
+                return url
+            fresh = self._fresh(key)
+        return fresh if fresh is not None else self._resolve_key(key)
+
+    def refresh(self, url: str) -> Optional[str]:
+        """Replace a URL the content server rejected; None if it is not ours."""
+        with self._lock:
+            key = self._owner.get(url)
+            if key is None:
+                return None
+            latest = self._urls.get(key, (url, None))[0]
+        if latest != url:
+            return latest  # Another transfer of the same file already renewed it
+        fresh = self._resolve_key(key)
+        with self._lock:
+            self.stats_counts["refreshed"] += 1
+        self.logger.info(json.dumps({"event": "url_refreshed", "item": key, "expires": url_expiry(fresh)}))
+        return fresh
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats_counts)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Dict, Optional
 
 
 def can_read_file(item: Any) -> bool:
@@ -19,3 +19,39 @@ def can_read_file(item: Any) -> bool:
         )
     except AttributeError:
         return False
+
+
+def remote_identity(item: Any) -> Optional[Dict[str, Any]]:
+    """Return the iCloud identity of a file's current content.
+
+    Args:
+        item: An iCloud Drive file item
+
+    Returns:
+        Dict with drivewsid, docwsid, etag, size and date_modified, or None
+        when the item carries no iCloud metadata
+    """
+    data = getattr(item, 'data', None)
+    if not isinstance(data, dict) or not data.get('docwsid'):
+        return None
+    return {
+        'drivewsid': data.get('drivewsid'),
+        'docwsid': data.get('docwsid'),
+        'etag': data.get('etag'),
+        'size': data.get('size'),
+        'date_modified': data.get('dateModified')
+    }
+
+
+def content_signature(item: Any) -> Optional[str]:
+    """Return the content signature iCloud sent with the item's download token.
+
+    Identical content has the same signature whatever the file's name or
+    document id, so copies and re-exports can be recognized. It is only
+    known once the download URL was resolved (see
+    url_resolver.resolve_download_url).
+    """
+    data = getattr(item, 'data', None)
+    if not isinstance(data, dict):
+        return None
+    return data.get('signature')
@@ -0,0 +1,96 @@
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Optional, Any
+
+
+class PositionalFile:
+    """Writes at absolute offsets of an open file, safe from several threads.
+
+    Uses ``os.pwrite`` where available, so writers never share (or move) the
+    file position; elsewhere each seek and write pair holds a lock.
+    """
+
+    def __init__(self, file: Any):
+        self._file = file
+        self._lock = threading.Lock()
+
+    def write_at(self, offset: int, data: Any) -> None:
+        """Write a bytes-like object (e.g. a memoryview) at ``offset``."""
+        if hasattr(os, 'pwrite'):
+            view = memoryview(data)
+            while view:
+                written = os.pwrite(self._file.fileno(), view, offset)
+                view = view[written:]
+                offset += written
+            return
+        with self._lock:
+            self._file.seek(offset)
+            self._file.write(data)
+
+
+class TempFileWriter:
+    """Positional writer for the temporary copy of a file being updated.
+
+    The temporary file is only created on the first write (or an explicit
+    call to ``prepare``), so files whose remote content matches the local
+    copy are never duplicated on disk. Writes are positional (``pwrite``),
+    so several threads may write different ranges at once.
+    """
+
+    def __init__(self, local_path: Path, temp_path: Path, total_size: int):
+        """Initialize the writer.
+
+        Args:
+            local_path: Existing local copy of the file, if any
+            temp_path: Path of the temporary file to write
+            total_size: Final size of the remote file in bytes
+        """
+        self.local_path = local_path
+        self.temp_path = temp_path
+        self.total_size = total_size
+        self._file: Optional[Any] = None
+        self._positional: Optional[PositionalFile] = None
+        self._lock = threading.Lock()
+
+    @property
+    def prepared(self) -> bool:
+        """Whether the temporary file has been created."""
+        return self._file is not None
+
+    def prepare(self) -> None:
+        """Create the temporary file from the local copy or as an empty file."""
+        with self._lock:
+            if self._file is not None:
+                return
+
+            self.temp_path.parent.mkdir(parents=True, exist_ok=True)
+            if self.local_path.exists():
+                shutil.copy2(self.local_path, self.temp_path)
+            else:
+                with self.temp_path.open('wb') as f:
+                    if self.total_size > 0:
+                        f.seek(self.total_size - 1)
+                        f.write(b'\0')
+
+            self._file = self.temp_path.open('r+b')
+            self._positional = PositionalFile(self._file)
+
+    def write_at(self, offset: int, data: Any) -> None:
+        """Write data at an absolute offset of the temporary file."""
+        self.prepare()
+        self._positional.write_at(offset, data)
+
+    def finish(self) -> None:
+        """Trim the temporary file to the remote size and close it."""
+        if self._file is not None:
+            self._file.truncate(self.total_size)
+        self.close()
+
+    def close(self) -> None:
+        """Close the temporary file if it is open."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._positional = None